@@ -0,0 +1,86 @@
+"""Rollout throughput benchmark
+
+Compares the dedicated playout engine with the previous rollout path that
+drives full game states with two random bots.
+
+"""
+import random
+import time
+
+from dlgo import goboard_array
+from dlgo import goboard_fast
+from dlgo import gotypes
+from dlgo import playout
+from dlgo.agent import RandomBot
+
+BOARD_SIZE = 9
+DURATION = 5.0
+
+
+def game_state_rollout(game):
+    """Rollout through GameState.apply_move and RandomBot
+
+    Args:
+        game:
+
+    Returns:
+        winner
+
+    """
+    bots = {
+        gotypes.Player.black: RandomBot(),
+        gotypes.Player.white: RandomBot(),
+    }
+    while not game.is_over():
+        bot_move = bots[game.next_player].select_move(game)
+        game = game.apply_move(bot_move)
+
+    return game.winner()
+
+
+def engine_rollout(game):
+    """Rollout through the playout engine
+
+    Args:
+        game:
+
+    Returns:
+        winner
+
+    """
+    return playout.simulate_game(game).winner
+
+
+def measure(rollout, game):
+    """Playouts per second of a rollout function
+
+    Args:
+        rollout:
+        game:
+
+    Returns:
+        float
+
+    """
+    count = 0
+    start_time = time.time()
+    while time.time() - start_time < DURATION:
+        rollout(game)
+        count += 1
+
+    return count / (time.time() - start_time)
+
+
+def main():
+    random.seed(0)
+    for name, rollout, module in (
+            ('GameState + RandomBot (goboard_fast)', game_state_rollout, goboard_fast),
+            ('GameState + RandomBot (goboard_array)', game_state_rollout, goboard_array),
+            ('playout engine', engine_rollout, goboard_array),
+    ):
+        game = module.GameState.new_game(BOARD_SIZE)
+        print('%-40s %8.1f playouts/s' % (name, measure(rollout, game)))
+
+
+if __name__ == '__main__':
+    main()
@@ -7,6 +7,9 @@ from dlgo.gotypes import Point
 def is_point_an_eye(board, point, color):
     """Whether this point is the eye
 
+    Boards with precomputed neighbour and corner tables are checked through
+    them; any other board through its ``get`` and ``is_on_grid``.
+
     Args:
         board:
         point:
@@ -16,9 +19,15 @@ def is_point_an_eye(board, point, color):
         Move
 
     """
+    if hasattr(board, 'is_point_an_eye'):
+        return board.is_point_an_eye(point, color)
+
     if board.get(point) is not None:  # eye is a empty point
         return False
 
+    if hasattr(board, 'corners'):
+        return _is_eye_in_tables(board, point, color)
+
     for neighbor in point.neighbors():  # all adjacent points must contain friendly stones
         if board.is_on_grid(neighbor):
             neighbor_color = board.get(neighbor)
@@ -49,3 +58,38 @@ def is_point_an_eye(board, point, color):
         return off_board_corners + friendly_corners == 4
 
     return friendly_corners >= 3
+
+
+def _is_eye_in_tables(board, point, color):
+    # The tables only hold the neighbours and corners on the board.
+    for neighbor in board.neighbors(point):
+        if board.get(neighbor) != color:
+            return False
+    corners = board.corners(point)
+    friendly_corners = 0
+    for corner in corners:
+        if board.get(corner) == color:
+            friendly_corners += 1
+    if len(corners) < 4:
+        return friendly_corners == len(corners)
+    return friendly_corners >= 3
+
+
+def eye_points(board, color):
+    """All the empty points that are eyes of ``color``
+
+    Args:
+        board:
+        color:
+
+    Returns:
+        list of Point
+
+    """
+    if hasattr(board, 'eye_points'):
+        return board.eye_points(color)
+    return [
+        Point(row=row, col=col)
+        for row in range(1, board.num_rows + 1)
+        for col in range(1, board.num_cols + 1)
+        if is_point_an_eye(board, Point(row=row, col=col), color)]
@@ -1,13 +1,51 @@
+import collections
+import contextlib
 import random
 import math
+import multiprocessing
+import time
+
+import numpy as np
 
 from dlgo import agent
-from dlgo.gotypes import Player
+from dlgo import playout
+from dlgo.agent.node_store import (
+    EXPANDING, NUM_ROUNDS, UNEXPANDED, NodeStore, decode_move, encode_move,
+)
+from dlgo.goboard_fast import Move
+from dlgo.gotypes import Player, Point
+from dlgo.rules import POSITIONAL, SIMPLE, get_rules
+
+# Rollouts a worker adds to every node on its path while its own rollout is
+# in flight, so that concurrent workers are steered to other branches.
+VIRTUAL_LOSS = 1
+
+# Most nodes a shared tree is given room for.
+SHARED_TREE_CAPACITY = 1 << 22
+
+# Moves still to be played, when a game clock does not say, are guessed as
+# half the empty points but at least this many.
+MIN_MOVES_TO_GO = 10
+
+# Rounds between checks of the early stopping rule.
+EARLY_STOP_INTERVAL = 16
+
+# Lock guarding the shared tree, handed to each worker process on startup.
+_tree_lock = None
 
 
 class MCTSNode:
     """Tree data structure
 
+    With a transposition table one node may be the child of several parents,
+    so the move leading to a child and the statistics of that edge are kept
+    by the parent, in ``child_moves``, ``child_rollouts`` and ``child_wins``.
+    ``parent`` and ``move`` are those of the first edge.
+
+    Moves are generated on the first expansion, not when the node is
+    created, since most leaves never get expanded. Candidates are checked
+    for legality only as they are drawn to become children.
+
     """
     def __init__(self, game_state, parent=None, move=None):
         self.game_state = game_state
@@ -19,20 +57,57 @@ class MCTSNode:
         }
         self.num_rollouts = 0
         self.children = []
-        self.unvisted_moves = game_state.legal_moves()
+        self.child_moves = []
+        # Candidate moves not added yet, None until generated. The last one
+        # is known to be legal when _drawn is set.
+        self._unvisited = None
+        self._drawn = False
+        # Rollouts and wins of the children, by position, for the player to
+        # move here: the arrays UCT selection runs over, sized once the
+        # candidates are known.
+        self.child_rollouts = None
+        self.child_wins = None
+        self.total_child_rollouts = 0
+        # Children moves encoded as by node_store.encode_move.
+        self.child_codes = None
+        # All-moves-as-first rollouts and wins by encoded move, for the
+        # player to move here; only kept by RAVE searches.
+        self.amaf_rollouts = None
+        self.amaf_wins = None
+        # Transposition table key, once the node is in a table.
+        self.key = None
 
-    def add_random_child(self):
+    def add_random_child(self, transpositions=None, exclude=()):
         """Add new child to the tree
 
+        Args:
+            transpositions: TranspositionTable to share nodes through
+            exclude: nodes not to share, such as those on the current path
+
         Returns:
             new node
 
         """
-        index = random.randint(0, len(self.unvisted_moves) - 1)
-        new_move = self.unvisted_moves.pop(index)
+        if not self.can_add_child():
+            raise ValueError('No legal moves left to add')
+        new_move = self._unvisited.pop()
+        self._drawn = False
         new_game_state = self.game_state.apply_move(new_move)
-        new_node = MCTSNode(new_game_state, self, new_move)
+        new_node = None
+        if transpositions is not None:
+            key = TranspositionTable.key(new_game_state)
+            new_node = transpositions.get(key)
+            if new_node is not None and new_node in exclude:
+                new_node = None
+        if new_node is None:
+            new_node = MCTSNode(new_game_state, self, new_move)
+            if transpositions is not None:
+                transpositions.add(key, new_node)
+        board = self.game_state.board
+        self.child_codes[len(self.children)] = encode_move(
+            new_move, board.num_rows, board.num_cols)
         self.children.append(new_node)
+        self.child_moves.append(new_move)
 
         return new_node
 
@@ -46,14 +121,102 @@ class MCTSNode:
         self.win_counts[winner] += 1
         self.num_rollouts += 1
 
+    def record_child_win(self, index, winner):
+        """Update the statistics of the edge to a child
+
+        Args:
+            index: position of the child
+            winner:
+
+        Returns:
+            None
+
+        """
+        self.child_rollouts[index] += 1
+        self.total_child_rollouts += 1
+        if winner == self.game_state.next_player:
+            self.child_wins[index] += 1
+
+    def record_amaf(self, first_players, first_times, depth, winner):
+        """Update the all-moves-as-first statistics
+
+        Every point first played, from this node on, by the player to move
+        here counts as a rollout of the move to that point.
+
+        Args:
+            first_players: array of the player value that first played at
+                each encoded move in the round, 0 for none
+            first_times: array of the ply of those plays, counted from the
+                root
+            depth: ply of this node
+            winner:
+
+        Returns:
+            None
+
+        """
+        if self.amaf_rollouts is None:
+            self.amaf_rollouts = np.zeros(len(first_players), np.int32)
+            self.amaf_wins = np.zeros(len(first_players), np.int32)
+        player = self.game_state.next_player
+        played = (first_players == player.value) & (first_times >= depth)
+        self.amaf_rollouts[played] += 1
+        if winner == player:
+            self.amaf_wins[played] += 1
+
+    @property
+    def unvisted_moves(self):
+        """Candidate moves not added to the tree yet, some of which may
+        turn out to be illegal"""
+        if self._unvisited is None:
+            self._generate_moves()
+        return self._unvisited
+
+    def _generate_moves(self):
+        moves = _candidate_moves(self.game_state)
+        self._unvisited = moves
+        self.child_rollouts = np.zeros(len(moves), np.int32)
+        self.child_wins = np.zeros(len(moves), np.int32)
+        self.child_codes = np.zeros(len(moves), np.int32)
+
     def can_add_child(self):
         """Position provides valid moves that have not yet been added to the tree
 
+        Draws a random candidate, dropping illegal ones, and keeps it last
+        for ``add_random_child``.
+
         Returns:
             bool
 
         """
-        return len(self.unvisted_moves) > 0
+        if self._drawn:
+            return True
+        moves = self.unvisted_moves
+        while moves:
+            index = random.randint(0, len(moves) - 1)
+            moves[index], moves[-1] = moves[-1], moves[index]
+            if self.game_state.is_valid_move(moves[-1]):
+                self._drawn = True
+                return True
+            moves.pop()
+        return False
+
+    def set_game_state(self, game_state):
+        """Move the node onto another line reaching the same position
+
+        Candidates drawn from now on are checked against the history of the
+        new state. Children already added are kept, even if some of them
+        are illegal on the new line.
+
+        Args:
+            game_state:
+
+        Returns:
+            None
+
+        """
+        self.game_state = game_state
+        self._drawn = False
 
     def is_terminal(self):
         """Game end in this node
@@ -76,53 +239,636 @@ class MCTSNode:
         return float(self.win_counts[player]) / float(self.num_rollouts)
 
 
+def _candidate_moves(game_state):
+    """Moves worth trying at a position: plays on the empty points the board
+    does not already rule out, then pass and resign
+
+    Plays are not checked for ko, nor for self capture on boards that do not
+    track legality themselves.
+
+    Args:
+        game_state:
+
+    Returns:
+        list of Move
+
+    """
+    if game_state.is_over():
+        return []
+    board = game_state.board
+    if hasattr(board, 'legal_points'):
+        points = board.legal_points(game_state.next_player)
+    else:
+        points = [
+            Point(row, col)
+            for row in range(1, board.num_rows + 1)
+            for col in range(1, board.num_cols + 1)
+            if board.get(Point(row, col)) is None
+        ]
+    moves = [Move.play(point) for point in points]
+    moves.append(Move.pass_turn())
+    moves.append(Move.resign())
+    return moves
+
+
+class TranspositionTable:
+    """Search tree nodes by position, so that transposed move orders share
+    one node and its statistics
+
+    Positions are told apart by player to move and Zobrist hash, plus
+    whether the last move was a pass and whether the game is over: without
+    those, two passes would lead back to the node of the starting position.
+    The key leaves out the history, so a shared node keeps the game state
+    of the line that created it, and its legal moves may differ from
+    another line's through ko as well as superko: the same position can be
+    reached once with a ko just taken and once without. Inside the tree
+    this only blurs the estimates; a root taken over from an earlier
+    search is given the real game state, see ``MCTSAgent.advance_root``.
+
+    Args:
+        max_size: number of nodes kept; beyond it the least recently
+            visited one is evicted. Evicted nodes stay in the tree, they are
+            just no longer shared.
+
+    """
+    def __init__(self, max_size):
+        self.max_size = max_size
+        self._nodes = collections.OrderedDict()
+
+    @staticmethod
+    def key(game_state):
+        last_move = game_state.last_move
+        return (
+            game_state.next_player,
+            game_state.board.zobrist_hash(),
+            last_move is not None and last_move.is_pass,
+            game_state.is_over(),
+        )
+
+    def __len__(self):
+        return len(self._nodes)
+
+    def get(self, key):
+        """Node for the key, marked as visited, or None"""
+        node = self._nodes.get(key)
+        if node is not None:
+            self._nodes.move_to_end(key)
+        return node
+
+    def add(self, key, node):
+        """Store a new node, evicting the least recently visited if full"""
+        node.key = key
+        self._nodes[key] = node
+        if len(self._nodes) > self.max_size:
+            self._nodes.popitem(last=False)
+
+    def touch(self, node):
+        """Mark a node as visited"""
+        if node.key in self._nodes:
+            self._nodes.move_to_end(node.key)
+
+    def clear(self):
+        self._nodes.clear()
+
+
 class MCTSAgent(agent.Agent):
-    def __init__(self, num_rounds, temperature):
+    """Monte Carlo tree search agent
+
+    Args:
+        num_rounds: rounds of search per move, or None to search until
+            the time for the move is up, as set by ``time_per_move`` or
+            ``set_clock``
+        temperature: UCT exploration weight
+        num_workers: worker processes searching in parallel
+        parallel: with several workers, 'root' splits the rounds between
+            independent trees from the same position and merges their root
+            statistics; 'tree' has all workers grow one tree in shared
+            memory, using virtual loss to spread them over different
+            branches; 'leaf' grows one MCTSNode tree here and has every
+            worker play ``rollouts_per_leaf`` rollouts from each new leaf
+        tree: 'node' keeps the tree as MCTSNode objects, each holding its
+            game state; 'array' keeps it in a compact NodeStore and
+            rebuilds positions by replaying moves. Tree-parallel search
+            always uses a shared NodeStore.
+        reuse_tree: keep the MCTSNode tree between moves and carry on
+            searching from the node reached by the moves played since,
+            instead of starting from an empty tree
+        transpositions: size of a TranspositionTable shared by the
+            MCTSNode trees of this agent; None searches without one
+        time_per_move: seconds to search per move at most; see also
+            ``set_clock``
+        early_stop: pick the root child with the most rollouts rather
+            than the best win rate, and stop an MCTSNode search once no
+            other child could catch up with it even if it got every
+            rollout left
+        rave: equivalence parameter k of RAVE for MCTSNode searches, None
+            for plain UCT. The value of a child blends its win rate with
+            the all-moves-as-first win rate of its move, the latter
+            weighted by sqrt(k / (3 n + k)) after n rollouts.
+        rollouts_per_leaf: rollouts played from each new MCTSNode leaf
+
+    """
+    def __init__(self, num_rounds, temperature, num_workers=1,
+                 parallel='root', tree='node', reuse_tree=True,
+                 transpositions=None, time_per_move=None, early_stop=False,
+                 rave=None, rollouts_per_leaf=1):
         agent.Agent.__init__(self)
+        if parallel not in ('root', 'tree', 'leaf'):
+            raise ValueError('Unknown parallel search mode: %r' % parallel)
+        if tree not in ('node', 'array'):
+            raise ValueError('Unknown search tree kind: %r' % tree)
+        if parallel == 'leaf' and tree != 'node':
+            raise ValueError('Leaf parallelization needs an MCTSNode tree')
+        leaf_parallel = parallel == 'leaf' and num_workers > 1
+        if rave is not None and leaf_parallel:
+            raise ValueError('RAVE needs the rollouts played in this process')
+        array_tree = tree == 'array' or (
+            parallel == 'tree' and num_workers > 1)
+        if array_tree and (
+                early_stop or rave is not None or rollouts_per_leaf > 1):
+            raise ValueError(
+                'early_stop, rave and rollouts_per_leaf need an MCTSNode '
+                'tree')
         self.num_rounds = num_rounds
         self.temperature = temperature
+        self.num_workers = num_workers
+        self.parallel = parallel
+        self.tree = tree
+        self.reuse_tree = reuse_tree
+        self.transpositions = transpositions
+        self._table = None
+        if transpositions is not None:
+            self._table = TranspositionTable(transpositions)
+        self.time_per_move = time_per_move
+        self.early_stop = early_stop
+        self.rave = rave
+        self.rollouts_per_leaf = rollouts_per_leaf
+        self._clock = None
+        self._root = None
+        self._pool = None
 
-    def select_move(self, game_state):
-        root = MCTSNode(game_state)
+    def set_clock(self, seconds_left, moves_to_go=None):
+        """Time left on the game clock, to be shared out between the moves
+        still to be played; call again before each move
 
-        for i in range(self.num_rounds):
-            node = root
-            while (not node.can_add_child()) and (not node.is_terminal()):
-                node = self.select_child(node)
+        Args:
+            seconds_left:
+            moves_to_go: moves this agent still has to play in the time,
+                guessed from the board when None
 
-            # Add a new child node into the tree.
-            if node.can_add_child():
-                node = node.add_random_child()
+        Returns:
+            None
 
-            # Simulate a random game from this node.
-            winner = self.simulate_random_game(node.game_state)
+        """
+        self._clock = (seconds_left, moves_to_go)
 
-            # Propagate scores back up the tree.
-            while node is not None:
-                node.record_win(winner)
-                node = node.parent
+    def move_time(self, game_state):
+        """Seconds to search the game state for, or None for no limit
+
+        Args:
+            game_state:
+
+        Returns:
+            float or None
+
+        """
+        budget = self.time_per_move
+        if self._clock is not None:
+            seconds_left, moves_to_go = self._clock
+            if moves_to_go is None:
+                board = game_state.board
+                empty_points = sum(
+                    1
+                    for row in range(1, board.num_rows + 1)
+                    for col in range(1, board.num_cols + 1)
+                    if board.get(Point(row, col)) is None)
+                moves_to_go = max(MIN_MOVES_TO_GO, empty_points // 2)
+            share = seconds_left / moves_to_go
+            budget = share if budget is None else min(budget, share)
+        return budget
+
+    def select_move(self, game_state):
+        deadline = None
+        budget = self.move_time(game_state)
+        if budget is not None:
+            deadline = time.time() + budget
+        if self.num_rounds is None and deadline is None:
+            raise ValueError('Either num_rounds or a time limit is needed')
 
+        if self.num_workers > 1 and self.parallel == 'tree':
+            root_stats = self.shared_tree_stats(game_state, deadline)
+        elif self.num_workers > 1 and self.parallel == 'root':
+            root_stats = self.parallel_root_stats(game_state, deadline)
+        elif self.tree == 'node' and self.reuse_tree:
+            root = self.search(
+                game_state, self.num_rounds, self.advance_root(game_state),
+                deadline)
+            self._root = root
+            root_stats = self.root_stats(root)
+        else:
+            root_stats = self.search_stats(
+                game_state, self.num_rounds, deadline)
+
+        # A reused root may have children that are only legal on the line
+        # that created it.
+        root_stats = [
+            (move, wins, rollouts) for move, wins, rollouts in root_stats
+            if rollouts and game_state.is_valid_move(move)
+        ]
         scored_moves = [
-            (child.winning_frac(game_state.next_player), child.move, child.num_rollouts)
-            for child in root.children
+            (wins / rollouts, move, rollouts)
+            for move, wins, rollouts in root_stats
         ]
         scored_moves.sort(key=lambda x: x[0], reverse=True)
         for s, m, n in scored_moves[:10]:
             print('%s - %.3f (%d)' % (m, s, n))
 
         # Having performed as many MCTS rounds as we have time for, we
-        # now pick a move.
+        # now pick a move. Early stopping only guarantees the most visited
+        # child stays ahead, so that is the one picked then.
         best_move = None
         best_pct = -1.0
-        for child in root.children:
-            child_pct = child.winning_frac(game_state.next_player)
-            if child_pct > best_pct:
+        best_rollouts = 0
+        for move, wins, rollouts in root_stats:
+            child_pct = wins / rollouts
+            if self.early_stop:
+                better = (rollouts, child_pct) > (best_rollouts, best_pct)
+            else:
+                better = child_pct > best_pct
+            if better:
                 best_pct = child_pct
-                best_move = child.move
+                best_rollouts = rollouts
+                best_move = move
         print('Select move %s with win pct %.3f' % (best_move, best_pct))
 
         return best_move
 
+    def advance_root(self, game_state):
+        """Node of the kept tree for the game state, if it was searched
+
+        Follows the moves played since the last search down from the old
+        root, at most two: ours and the opponent's reply. The node found
+        becomes the root of a tree of its own, and the rest of the old tree
+        is dropped. It takes over the game state passed in, as a node shared
+        through the transposition table may have been reached along another
+        line.
+
+        Args:
+            game_state:
+
+        Returns:
+            MCTSNode or None
+
+        """
+        root, self._root = self._root, None
+        if root is None:
+            return None
+
+        situation = TranspositionTable.key
+        moves = []
+        state = game_state
+        while situation(state) != situation(root.game_state):
+            if len(moves) == 2 or state.previous_state is None:
+                return None
+            moves.append(state.last_move)
+            state = state.previous_state
+
+        node = root
+        for move in reversed(moves):
+            for child_move, child in zip(node.child_moves, node.children):
+                if child_move == move:
+                    node = child
+                    break
+            else:
+                return None
+        if situation(node.game_state) != situation(game_state):
+            return None
+
+        # A node shared through the transposition table may have been
+        # created on another line, with other ko restrictions.
+        if node.game_state is not game_state:
+            node.set_game_state(game_state)
+        node.parent = None
+        return node
+
+    def search(self, game_state, num_rounds, root=None, deadline=None):
+        """Grow a search tree from the game state
+
+        Args:
+            game_state:
+            num_rounds: None for no limit
+            root: tree to keep growing, from an earlier search of the same
+                position
+            deadline: ``time.time()`` to stop at, if any
+
+        Returns:
+            root MCTSNode
+
+        """
+        table = self._table
+        if root is None:
+            root = MCTSNode(game_state)
+            if table is not None:
+                table.clear()
+                table.add(table.key(game_state), root)
+
+        start = time.time()
+        rounds = 0
+        while num_rounds is None or rounds < num_rounds:
+            if deadline is not None and time.time() >= deadline:
+                break
+            if self.early_stop and rounds % EARLY_STOP_INTERVAL == 0:
+                rounds_left = self._rounds_left(
+                    num_rounds, rounds, start, deadline)
+                if rounds_left is not None:
+                    rounds_left *= self.rollouts_per_leaf
+                    if self.parallel == 'leaf':
+                        rounds_left *= self.num_workers
+                if self.is_decided(root, rounds_left):
+                    break
+            rounds += 1
+
+            node = root
+            path = [root]
+            indices = []
+            while (not node.can_add_child()) and (not node.is_terminal()):
+                index = self.select_child_index(node)
+                child = node.children[index]
+                if table is not None:
+                    # A shared node can lead back onto the path; simulate
+                    # from here rather than go round in circles.
+                    if child in path:
+                        break
+                    table.touch(child)
+                node = child
+                path.append(node)
+                indices.append(index)
+
+            # Add a new child node into the tree.
+            if node.can_add_child():
+                indices.append(len(node.children))
+                node = node.add_random_child(table, path)
+                path.append(node)
+
+            # Simulate random games from this node.
+            if self.num_workers > 1 and self.parallel == 'leaf':
+                winners = self.simulate_on_workers(node.game_state)
+            elif self.rave is not None:
+                winners = []
+                for _ in range(self.rollouts_per_leaf):
+                    moves = []
+                    winner = self.simulate_random_game(node.game_state, moves)
+                    self._record_amaf(path, indices, moves, winner)
+                    winners.append(winner)
+            else:
+                winners = self.simulate_random_games(
+                    node.game_state, self.rollouts_per_leaf)
+
+            # Propagate scores back up the tree.
+            for winner in winners:
+                for node in path:
+                    node.record_win(winner)
+                for node, index in zip(path, indices):
+                    node.record_child_win(index, winner)
+
+        return root
+
+    @staticmethod
+    def _record_amaf(path, indices, rollout_moves, winner):
+        board = path[0].game_state.board
+        num_rows, num_cols = board.num_rows, board.num_cols
+        # Plies of the round: the tree moves down the path, then the
+        # rollout.
+        plays = [
+            (node.game_state.next_player, node.child_codes[index])
+            for node, index in zip(path, indices)
+        ]
+        plays.extend(
+            (player, (point.row - 1) * num_cols + point.col - 1)
+            for player, point in rollout_moves)
+
+        size = num_rows * num_cols + 2
+        first_players = np.zeros(size, np.int8)
+        first_times = np.zeros(size, np.int32)
+        for ply in range(len(plays) - 1, -1, -1):
+            player, code = plays[ply]
+            first_players[code] = player.value
+            first_times[code] = ply
+        # Passing and resigning are no plays on the board.
+        first_players[num_rows * num_cols:] = 0
+
+        for depth, node in enumerate(path):
+            if node.children:
+                node.record_amaf(first_players, first_times, depth, winner)
+
+    @staticmethod
+    def _rounds_left(num_rounds, rounds, start, deadline):
+        left = None
+        if num_rounds is not None:
+            left = num_rounds - rounds
+        if deadline is not None and rounds:
+            # At the pace so far.
+            now = time.time()
+            pace = (now - start) / rounds
+            in_time = int((deadline - now) / pace) if pace > 0 else 0
+            left = in_time if left is None else min(left, in_time)
+        return left
+
+    @staticmethod
+    def is_decided(root, rounds_left):
+        """Whether more rounds cannot change the move picked at the root
+
+        Args:
+            root:
+            rounds_left: None if unknown
+
+        Returns:
+            bool
+
+        """
+        if rounds_left is None:
+            return False
+        count = len(root.children)
+        if count == 0:
+            return False
+        if count == 1 and not root.can_add_child():
+            return True
+        # The move is picked by rollouts. Every rollout left going to the
+        # runner-up, or to a child not added yet, must not let it catch up.
+        rollouts = np.sort(root.child_rollouts[:count])
+        runner_up = rollouts[-2] if count > 1 else 0
+        return runner_up + rounds_left < rollouts[-1]
+
+    def array_search(self, game_state, num_rounds, deadline=None):
+        """Grow a search tree from the game state in a local NodeStore
+
+        Args:
+            game_state:
+            num_rounds: None for no limit
+            deadline: ``time.time()`` to stop at, if any
+
+        Returns:
+            NodeStore with the root at index 0
+
+        """
+        store = NodeStore(1024)
+        store.add_root()
+        _grow_array_tree(
+            store, game_state, num_rounds, self.temperature,
+            deadline=deadline)
+        return store
+
+    def search_stats(self, game_state, num_rounds, deadline=None):
+        """Search in this process and return the root children statistics
+
+        Args:
+            game_state:
+            num_rounds: None for no limit
+            deadline: ``time.time()`` to stop at, if any
+
+        Returns:
+            list of (move, wins of the player to move, rollouts)
+
+        """
+        if self.tree == 'array':
+            store = self.array_search(game_state, num_rounds, deadline)
+            return _array_root_stats(
+                store, game_state.board.num_rows, game_state.board.num_cols)
+        return self.root_stats(
+            self.search(game_state, num_rounds, deadline=deadline))
+
+    @staticmethod
+    def root_stats(root):
+        """Statistics of the root children
+
+        Args:
+            root:
+
+        Returns:
+            list of (move, wins of the player to move, rollouts)
+
+        """
+        return [
+            (move, int(root.child_wins[index]),
+             int(root.child_rollouts[index]))
+            for index, move in enumerate(root.child_moves)
+        ]
+
+    def parallel_root_stats(self, game_state, deadline=None):
+        """Search independent trees in worker processes and merge the
+        statistics of their root children
+
+        Args:
+            game_state:
+            deadline: ``time.time()`` to stop at, if any
+
+        Returns:
+            list of (move, wins of the player to move, rollouts)
+
+        """
+        tasks = []
+        for worker in range(self.num_workers):
+            num_rounds = None
+            if self.num_rounds is not None:
+                num_rounds = self.num_rounds // self.num_workers
+                if worker < self.num_rounds % self.num_workers:
+                    num_rounds += 1
+            if num_rounds != 0:
+                # Forked workers share the parent's random state, so each
+                # one gets its own seed.
+                tasks.append((
+                    game_state, num_rounds, deadline, self.temperature,
+                    self.tree, self.transpositions, self.early_stop,
+                    self.rave, self.rollouts_per_leaf,
+                    random.getrandbits(64)))
+
+        merged = {}
+        for stats in self._get_pool().map(_search_root, tasks):
+            for move, wins, rollouts in stats:
+                if move in merged:
+                    merged[move][0] += wins
+                    merged[move][1] += rollouts
+                else:
+                    merged[move] = [wins, rollouts]
+
+        return [
+            (move, wins, rollouts)
+            for move, (wins, rollouts) in merged.items()
+        ]
+
+    def shared_tree_stats(self, game_state, deadline=None):
+        """Grow one tree from all worker processes and return the
+        statistics of its root children
+
+        Args:
+            game_state:
+            deadline: ``time.time()`` to stop at, if any
+
+        Returns:
+            list of (move, wins of the player to move, rollouts)
+
+        """
+        num_rows = game_state.board.num_rows
+        num_cols = game_state.board.num_cols
+        # Every round expands at most one node, by at most one child per
+        # point plus pass and resign. Beyond SHARED_TREE_CAPACITY the store
+        # fills up and further leaves just stay unexpanded.
+        capacity = SHARED_TREE_CAPACITY
+        if self.num_rounds is not None:
+            capacity = min(
+                capacity, 1 + self.num_rounds * (num_rows * num_cols + 2))
+        store = NodeStore(capacity, shared=True)
+        try:
+            store.add_root()
+            task = (
+                store.name, capacity, game_state, self.num_rounds, deadline,
+                self.temperature)
+            self._get_pool().map(_search_shared, [
+                task + (random.getrandbits(64),)
+                for _ in range(self.num_workers)
+            ])
+            return _array_root_stats(store, num_rows, num_cols)
+        finally:
+            store.close()
+            store.unlink()
+
+    def simulate_on_workers(self, game_state):
+        """Winners of ``rollouts_per_leaf`` random games per worker process,
+        all played from the game state
+
+        Args:
+            game_state:
+
+        Returns:
+            list of Player
+
+        """
+        if game_state.is_over():
+            return [game_state.winner()] * (
+                self.num_workers * self.rollouts_per_leaf)
+        position = playout.encode_position(game_state)
+        winners = []
+        for black_wins, white_wins in self._get_pool().map(_leaf_rollouts, [
+                (position, self.rollouts_per_leaf, random.getrandbits(64))
+                for _ in range(self.num_workers)]):
+            winners += [Player.black] * black_wins
+            winners += [Player.white] * white_wins
+        return winners
+
+    def _get_pool(self):
+        if self._pool is None:
+            self._pool = multiprocessing.Pool(
+                self.num_workers, initializer=_init_worker,
+                initargs=(multiprocessing.Lock(),))
+        return self._pool
+
+    def close(self):
+        """Shut down the worker processes, if any were started"""
+        if self._pool is not None:
+            self._pool.close()
+            self._pool.join()
+            self._pool = None
+
     @staticmethod
     def uct_score(parent_rollouts, child_rollouts, win_pct, temperature):
         """UCT score
@@ -134,6 +880,25 @@ class MCTSAgent(agent.Agent):
         exploration = math.sqrt(math.log(parent_rollouts) / child_rollouts)
         return win_pct + temperature * exploration
 
+    @staticmethod
+    def uct_scores(log_parent_rollouts, child_rollouts, child_wins,
+                   temperature):
+        """UCT scores of all children at once
+
+        Args:
+            log_parent_rollouts: log of the parent rollouts, computed once
+                per selection
+            child_rollouts: array of rollouts, none of them zero
+            child_wins: array of wins for the player to move at the parent
+            temperature:
+
+        Returns:
+            array of scores
+
+        """
+        exploration = np.sqrt(log_parent_rollouts / child_rollouts)
+        return child_wins / child_rollouts + temperature * exploration
+
     def select_child(self, node):
         """Branch selection for research
 
@@ -143,31 +908,414 @@ class MCTSAgent(agent.Agent):
         Returns:
 
         """
-        total_rollouts = sum(child.num_rollouts for child in node.children)
+        return node.children[self.select_child_index(node)]
+
+    def select_child_index(self, node):
+        """Position of the child ``select_child`` picks
+
+        Args:
+            node:
+
+        Returns:
+            int
 
-        best_score = -1
-        best_child = None
-        for child in node.children:
-            score = self.uct_score(
-                total_rollouts,
-                child.num_rollouts,
-                child.winning_frac(node.game_state.next_player),
+        """
+        count = len(node.children)
+        if self.rave is not None and node.amaf_rollouts is not None:
+            scores = self.rave_scores(node, self.rave, self.temperature)
+        else:
+            scores = self.uct_scores(
+                math.log(node.total_child_rollouts),
+                node.child_rollouts[:count],
+                node.child_wins[:count],
                 self.temperature,
             )
-            if score > best_score:
-                best_score = score
-                best_child = child
+        return int(np.argmax(scores))
+
+    @staticmethod
+    def rave_scores(node, equivalence, temperature):
+        """UCT scores of all children, with win rates blended with their
+        all-moves-as-first win rates
+
+        Args:
+            node:
+            equivalence: RAVE equivalence parameter k
+            temperature:
+
+        Returns:
+            array of scores
 
-        return best_child
+        """
+        count = len(node.children)
+        rollouts = node.child_rollouts[:count]
+        win_pcts = node.child_wins[:count] / rollouts
+        codes = node.child_codes[:count]
+        amaf_rollouts = node.amaf_rollouts[codes]
+        amaf_pcts = np.where(
+            amaf_rollouts > 0,
+            node.amaf_wins[codes] / np.maximum(amaf_rollouts, 1),
+            win_pcts)
+        beta = np.sqrt(equivalence / (3 * rollouts + equivalence))
+        values = (1 - beta) * win_pcts + beta * amaf_pcts
+        exploration = np.sqrt(math.log(node.total_child_rollouts) / rollouts)
+        return values + temperature * exploration
 
     @staticmethod
-    def simulate_random_game(game):
-        bots = {
-            Player.black: agent.RandomBot(),
-            Player.white: agent.RandomBot(),
-        }
-        while not game.is_over():
-            bot_move = bots[game.next_player].select_move(game)
-            game = game.apply_move(bot_move)
+    def simulate_random_game(game, moves=None):
+        if game.is_over():
+            return game.winner()
+
+        return playout.simulate_game(game, moves=moves).winner
+
+    @staticmethod
+    def simulate_random_games(game, num_games):
+        """Winners of ``num_games`` random games from the same position
+
+        Args:
+            game:
+            num_games:
+
+        Returns:
+            list of Player
 
-        return game.winner()
+        """
+        if game.is_over():
+            return [game.winner()] * num_games
+
+        return [
+            playout.simulate_game(game).winner for _ in range(num_games)
+        ]
+
+
+def _search_root(task):
+    """Worker entry point of root-parallel search
+
+    Args:
+        task: (game_state, num_rounds, deadline, temperature, tree,
+            transpositions, early_stop, rave, rollouts_per_leaf, seed)
+
+    Returns:
+        root children statistics
+
+    """
+    (game_state, num_rounds, deadline, temperature, tree, transpositions,
+     early_stop, rave, rollouts_per_leaf, seed) = task
+    random.seed(seed)
+    bot = MCTSAgent(
+        num_rounds, temperature, tree=tree, transpositions=transpositions,
+        time_per_move=None if deadline is None else deadline - time.time(),
+        early_stop=early_stop, rave=rave,
+        rollouts_per_leaf=rollouts_per_leaf)
+    return bot.search_stats(game_state, num_rounds, deadline)
+
+
+def _leaf_rollouts(task):
+    """Worker entry point of leaf-parallel search
+
+    Args:
+        task: (encoded position, num_rollouts, seed)
+
+    Returns:
+        (black wins, white wins)
+
+    """
+    position, num_rollouts, seed = task
+    random.seed(seed)
+    black_wins = 0
+    for _ in range(num_rollouts):
+        if playout.simulate_position(position).winner == Player.black:
+            black_wins += 1
+    return black_wins, num_rollouts - black_wins
+
+
+def _init_worker(lock):
+    global _tree_lock
+    _tree_lock = lock
+
+
+def _select_array_child(store, node, temperature):
+    """UCT selection among the children of a node in a node store
+
+    Children nobody has visited yet, counting virtual visits, come first, in
+    random order.
+
+    Returns:
+        index of the child
+
+    """
+    first = int(store.first_child[node])
+    count = int(store.num_children[node])
+    visits = store.visits[first:first + count]
+    unvisited = np.flatnonzero(visits == 0)
+    if len(unvisited):
+        return first + int(unvisited[random.randrange(len(unvisited))])
+    scores = MCTSAgent.uct_scores(
+        math.log(store.visits[node]), visits,
+        store.wins[first:first + count], temperature)
+    return first + int(np.argmax(scores))
+
+
+class _Line:
+    """Line of play from the root of an array tree, played out on one
+    scratch board
+
+    Array trees keep no game states. Each round plays the moves of its path
+    onto the scratch board with ``play`` and takes them back with ``undo``
+    afterwards, so no board is copied on the way down. Legal moves at the
+    end of the line follow the ko rule of the game, over the earlier
+    positions of the game and of the line.
+
+    Args:
+        game_state: position at the root
+
+    """
+    def __init__(self, game_state):
+        self.root = game_state
+        self.rules = get_rules(game_state)
+        self.board = playout.PlayoutBoard(game_state.board)
+        # Situations of the positions before the root.
+        self._root_situations = set()
+        if self.rules.ko != SIMPLE:
+            state = game_state.previous_state
+            while state is not None:
+                self._root_situations.add(
+                    (state.next_player, state.board.zobrist_hash()))
+                state = state.previous_state
+        self._reset()
+
+    def _reset(self):
+        game_state = self.root
+        last_move = game_state.last_move
+        previous = game_state.previous_state
+        self.moves = []
+        self.next_player = game_state.next_player
+        # Passes in a row up to the end of the line.
+        self.passes = 0
+        if last_move is not None and last_move.is_pass:
+            self.passes = 2 if game_state.is_over() else 1
+        self.resigned = last_move is not None and last_move.is_resign
+        self.ko_point = playout.initial_ko(game_state)
+        self._previous_hash = None
+        if previous is not None:
+            self._previous_hash = previous.board.zobrist_hash()
+        self._situations = set()
+        self._plays = 0
+
+    def play(self, move):
+        """Extend the line by one move
+
+        Args:
+            move:
+
+        Returns:
+            None
+
+        """
+        board = self.board
+        player = self.next_player
+        self._previous_hash = board.zobrist_hash()
+        self._situations.add((player, self._previous_hash))
+        self.ko_point = None
+        if move.is_play:
+            self.passes = 0
+            self._plays += 1
+            if board.play(player, move.point) == 1:
+                string = board.get_go_string(move.point)
+                if len(string.stones) == 1 and len(string.liberties) == 1:
+                    self.ko_point = next(iter(string.liberties))
+        elif move.is_pass:
+            self.passes += 1
+        else:
+            self.resigned = True
+        self.moves.append(move)
+        self.next_player = player.other
+
+    def take_back(self):
+        """Undo the whole line, back to the root
+
+        Returns:
+            None
+
+        """
+        for _ in range(self._plays):
+            self.board.undo()
+        self._reset()
+
+    def is_over(self):
+        return self.resigned or self.passes >= 2
+
+    def _violates_ko(self, point):
+        board = self.board
+        player = self.next_player
+        if not board.will_capture(player, point):
+            return False
+        next_hash = board.next_zobrist_hash(player, point)
+        ko = self.rules.ko
+        if ko == SIMPLE:
+            return self._previous_hash == next_hash
+        situations = [(player.other, next_hash)]
+        if ko == POSITIONAL:
+            situations.append((player, next_hash))
+        return any(
+            situation in self._situations or
+            situation in self._root_situations
+            for situation in situations)
+
+    def legal_moves(self):
+        """Legal moves at the end of the line
+
+        Returns:
+            list of Move
+
+        """
+        if self.is_over():
+            return []
+        moves = [
+            Move.play(point)
+            for point in self.board.legal_points(self.next_player)
+            if not self._violates_ko(point)
+        ]
+        # These two moves are always legal.
+        moves.append(Move.pass_turn())
+        moves.append(Move.resign())
+        return moves
+
+    def simulate(self):
+        """Winner of a random game from the end of the line
+
+        Returns:
+            Player
+
+        """
+        if self.resigned:
+            return self.next_player
+        if self.passes >= 2:
+            # Finished games are scored with the game's own rules, which
+            # may count prisoners; that needs the states of the line.
+            state = self.root
+            for move in self.moves:
+                state = state.apply_move(move)
+            return state.winner()
+        return playout.simulate_board(
+            self.board, self.next_player, self.ko_point, self.passes,
+            self.rules.komi).winner
+
+
+def _grow_array_tree(store, game_state, num_rounds, temperature,
+                     lock=None, deadline=None):
+    """Run search rounds on a node store until it has seen ``num_rounds``,
+    or until the deadline
+
+    Nodes keep no game states: each round plays the moves of its path on
+    one scratch board, which is taken back to the root afterwards.
+
+    With a lock the store may be shared between processes. Selection,
+    expansion and backpropagation then hold the lock, and a virtual loss on
+    the selected path steers concurrent workers to other branches;
+    replaying moves, listing legal moves and the rollout run unlocked.
+
+    Args:
+        store: NodeStore holding at least the root
+        game_state: position at the root
+        num_rounds: None for no limit
+        temperature:
+        lock:
+        deadline: ``time.time()`` to stop at, if any
+
+    Returns:
+        None
+
+    """
+    virtual_loss = VIRTUAL_LOSS
+    if lock is None:
+        lock = contextlib.nullcontext()
+        virtual_loss = 0
+    num_rows = game_state.board.num_rows
+    num_cols = game_state.board.num_cols
+    # Player who made the move into a node at even and at odd depths.
+    movers = (game_state.next_player.other, game_state.next_player)
+    line = _Line(game_state)
+
+    while deadline is None or time.time() < deadline:
+        with lock:
+            if num_rounds is not None and \
+                    store.header[NUM_ROUNDS] >= num_rounds:
+                break
+            store.header[NUM_ROUNDS] += 1
+            node = 0
+            path = [node]
+            store.visits[node] += virtual_loss
+            while store.num_children[node] > 0:
+                node = _select_array_child(store, node, temperature)
+                store.visits[node] += virtual_loss
+                path.append(node)
+            expand = store.first_child[node] == UNEXPANDED
+            if expand:
+                store.first_child[node] = EXPANDING
+            moves = store.move[path].tolist()
+
+        # The root has no move of its own.
+        for move in moves[1:]:
+            line.play(decode_move(move, num_rows, num_cols))
+
+        if expand:
+            legal_moves = line.legal_moves()
+            pick = None
+            with lock:
+                first = store.add_children(path[-1], [
+                    encode_move(move, num_rows, num_cols)
+                    for move in legal_moves
+                ])
+                if first >= 0 and legal_moves:
+                    pick = random.randrange(len(legal_moves))
+                    store.visits[first + pick] += virtual_loss
+                    path.append(first + pick)
+            if pick is not None:
+                line.play(legal_moves[pick])
+
+        winner = line.simulate()
+        line.take_back()
+
+        with lock:
+            for depth, node in enumerate(path):
+                store.visits[node] += 1 - virtual_loss
+                if movers[depth % 2] == winner:
+                    store.wins[node] += 1
+
+
+def _array_root_stats(store, num_rows, num_cols):
+    """Statistics of the root children of a node store
+
+    Returns:
+        list of (move, wins of the player to move, rollouts)
+
+    """
+    return [
+        (decode_move(int(store.move[child]), num_rows, num_cols),
+         int(store.wins[child]), int(store.visits[child]))
+        for child in store.children(0)
+        if store.visits[child] > 0
+    ]
+
+
+def _search_shared(task):
+    """Worker entry point of tree-parallel search
+
+    Args:
+        task: (store name, capacity, game_state, num_rounds, deadline,
+            temperature, seed)
+
+    Returns:
+        None
+
+    """
+    (name, capacity, game_state, num_rounds, deadline, temperature,
+     seed) = task
+    random.seed(seed)
+    store = NodeStore(capacity, name=name)
+    try:
+        _grow_array_tree(
+            store, game_state, num_rounds, temperature, lock=_tree_lock,
+            deadline=deadline)
+    finally:
+        store.close()
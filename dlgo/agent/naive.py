@@ -12,7 +12,16 @@ from dlgo.gotypes import Point
 class RandomBot(Agent):
     """Random bot
 
+    Args:
+        sample: draw points at random and play the first one that is valid
+            and not an own eye, instead of validating every point up front.
+            The chosen move has the same distribution either way.
+
     """
+    def __init__(self, sample=True):
+        Agent.__init__(self)
+        self.sample = sample
+
     def select_move(self, game_state):
         """Choose a random valid move that preserves our own eyes
 
@@ -22,6 +31,9 @@ class RandomBot(Agent):
         Returns:
             fixme
         """
+        if self.sample:
+            return self.sample_move(game_state)
+
         candidates = []
         for row in range(1, game_state.board.num_rows + 1):
             for col in range(1, game_state.board.num_cols + 1):
@@ -38,3 +50,37 @@ class RandomBot(Agent):
             return Move.pass_turn()
 
         return Move.play(random.choice(candidates))
+
+    @staticmethod
+    def sample_move(game_state):
+        """Draw candidate points without replacement until one is a valid
+        move that preserves our own eyes, usually after one or two checks
+
+        Args:
+            game_state:
+
+        Returns:
+            Move, a pass once every candidate is ruled out
+
+        """
+        board = game_state.board
+        player = game_state.next_player
+        if hasattr(board, 'legal_points'):
+            candidates = board.legal_points(player)
+        else:
+            candidates = [
+                Point(row=row, col=col)
+                for row in range(1, board.num_rows + 1)
+                for col in range(1, board.num_cols + 1)
+                if board.get(Point(row=row, col=col)) is None]
+
+        remaining = len(candidates)
+        while remaining:
+            pick = int(random.random() * remaining)
+            candidate = candidates[pick]
+            if game_state.is_valid_move(Move.play(candidate)) and \
+                    not is_point_an_eye(board, candidate, player):
+                return Move.play(candidate)
+            remaining -= 1
+            candidates[pick] = candidates[remaining]
+        return Move.pass_turn()
@@ -0,0 +1,205 @@
+"""Flat node storage module for Monte Carlo search trees
+
+Nodes live in preallocated NumPy columns, 24 bytes per node, instead of one
+Python object each. The children of a node are allocated together, as
+``num_children`` consecutive nodes starting at ``first_child``. A store is
+either local to the process, growing as needed, or of fixed size inside one
+shared memory block, so that several worker processes can grow and walk the
+same tree.
+
+"""
+from multiprocessing import shared_memory
+
+import numpy as np
+
+from dlgo.goboard_fast import Move
+from dlgo.gotypes import Point
+
+COLUMNS = (
+    ('parent', np.int32),
+    ('move', np.int32),
+    ('visits', np.int32),
+    ('wins', np.int32),
+    ('first_child', np.int32),
+    ('num_children', np.int32),
+)
+
+# first_child markers of nodes without children yet.
+UNEXPANDED = -1
+EXPANDING = -2
+
+# Header slots.
+NUM_NODES = 0
+NUM_ROUNDS = 1
+HEADER_SIZE = 2
+
+
+def encode_move(move, num_rows, num_cols):
+    """Move as an integer: board points in row-major order, then pass and
+    resign
+
+    Args:
+        move:
+        num_rows:
+        num_cols:
+
+    Returns:
+        int
+
+    """
+    if move.is_pass:
+        return num_rows * num_cols
+    if move.is_resign:
+        return num_rows * num_cols + 1
+    return (move.point.row - 1) * num_cols + move.point.col - 1
+
+
+def decode_move(code, num_rows, num_cols):
+    """Inverse of ``encode_move``
+
+    Args:
+        code:
+        num_rows:
+        num_cols:
+
+    Returns:
+        Move
+
+    """
+    if code == num_rows * num_cols:
+        return Move.pass_turn()
+    if code == num_rows * num_cols + 1:
+        return Move.resign()
+    return Move.play(Point(row=code // num_cols + 1, col=code % num_cols + 1))
+
+
+class NodeStore:
+    """Search tree nodes in NumPy columns
+
+    Args:
+        capacity: number of nodes to allocate room for; a local store grows
+            beyond it as needed, a shared one is fixed at this size
+        shared: place the columns in a new shared memory block
+        name: name of an existing shared store to attach to
+
+    """
+    def __init__(self, capacity, shared=False, name=None):
+        self.capacity = capacity
+        self._shm = None
+        if not shared and name is None:
+            self.header = np.zeros(HEADER_SIZE, np.int64)
+            for column, dtype in COLUMNS:
+                setattr(self, column, np.empty(capacity, dtype))
+            return
+
+        nbytes = HEADER_SIZE * 8 + sum(
+            capacity * np.dtype(dtype).itemsize for _, dtype in COLUMNS)
+        if name is None:
+            self._shm = shared_memory.SharedMemory(create=True, size=nbytes)
+        else:
+            self._shm = shared_memory.SharedMemory(name=name)
+
+        self.header = np.ndarray(
+            (HEADER_SIZE,), np.int64, buffer=self._shm.buf)
+        offset = HEADER_SIZE * 8
+        for column, dtype in COLUMNS:
+            setattr(self, column, np.ndarray(
+                (capacity,), dtype, buffer=self._shm.buf, offset=offset))
+            offset += capacity * np.dtype(dtype).itemsize
+        if name is None:
+            self.header[:] = 0
+
+    @property
+    def name(self):
+        """Name of the shared block, None for a local store"""
+        return None if self._shm is None else self._shm.name
+
+    def __len__(self):
+        return int(self.header[NUM_NODES])
+
+    def _grow(self, capacity):
+        for column, _ in COLUMNS:
+            old = getattr(self, column)
+            new = np.empty(capacity, old.dtype)
+            new[:len(old)] = old
+            setattr(self, column, new)
+        self.capacity = capacity
+
+    def _allocate(self, count):
+        first = int(self.header[NUM_NODES])
+        if first + count > self.capacity:
+            if self._shm is not None:
+                return -1
+            self._grow(max(2 * self.capacity, first + count))
+        self.header[NUM_NODES] = first + count
+        nodes = slice(first, first + count)
+        self.visits[nodes] = 0
+        self.wins[nodes] = 0
+        self.first_child[nodes] = UNEXPANDED
+        self.num_children[nodes] = 0
+        return first
+
+    def add_root(self):
+        """Allocate the root node
+
+        Returns:
+            index of the root
+
+        """
+        root = self._allocate(1)
+        self.parent[root] = -1
+        self.move[root] = -1
+        return root
+
+    def add_children(self, node, moves):
+        """Allocate consecutive children of a node, one per encoded move
+
+        Args:
+            node:
+            moves: encoded moves
+
+        Returns:
+            index of the first child, or -1 if a shared store is full, in
+            which case the node is left as a leaf without children
+
+        """
+        first = self._allocate(len(moves))
+        if first < 0:
+            self.first_child[node] = 0
+            self.num_children[node] = 0
+            return -1
+        children = slice(first, first + len(moves))
+        self.parent[children] = node
+        self.move[children] = moves
+        self.num_children[node] = len(moves)
+        self.first_child[node] = first
+        return first
+
+    def children(self, node):
+        """Indices of the children of an expanded node
+
+        Args:
+            node:
+
+        Returns:
+            range
+
+        """
+        first = int(self.first_child[node])
+        if first < 0:
+            return range(0)
+        return range(first, first + int(self.num_children[node]))
+
+    def close(self):
+        """Detach from the shared block, if any"""
+        if self._shm is None:
+            return
+        # The column views must go before the buffer can be released.
+        del self.header
+        for column, _ in COLUMNS:
+            delattr(self, column)
+        self._shm.close()
+
+    def unlink(self):
+        """Free the shared block; only the creating process calls this"""
+        self._shm.unlink()
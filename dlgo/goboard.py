@@ -206,7 +206,7 @@ class Board():
         for new_string_point in new_string.stones:
             self._grid[new_string_point] = new_string
 
-        self._hash ^= zobrist.HASH_CODE[point, player]
+        self._hash ^= self._zobrist_code(point, player)
 
         # Decline number of degrees of freedom of neighboring chains of stones of the same color
         for other_color_string in adjacent_opposite_color:
@@ -290,7 +290,12 @@ class Board():
 
             self._grid[point] = None
 
-            self._hash ^= zobrist.HASH_CODE[point, string.color]
+            self._hash ^= self._zobrist_code(point, string.color)
+
+    def _zobrist_code(self, point, player):
+        codes = zobrist.board_codes(self.num_rows, self.num_cols)
+        return codes[
+            3 * (point.row * (self.num_cols + 2) + point.col) + player.value]
 
     def zobrist_hash(self):
         """Current board hash
@@ -0,0 +1,909 @@
+"""Array-backed Go board module
+
+The position is kept in flat integer arrays over a padded 1-D layout: point
+(row, col) lives at index ``row * stride + col`` where ``stride = num_cols + 2``
+and the surrounding frame holds a ``BORDER`` sentinel, so neighbour lookups
+never need bounds checks. Every stone carries the id of its string (the index
+of the string's head stone), strings are threaded through a circular linked
+list and liberty counts are kept per string head.
+
+"""
+import array
+
+from dlgo.gotypes import Player, Point
+from dlgo import goboard_fast
+from dlgo.goboard_fast import GoString, Move
+from dlgo import zobrist
+
+__all__ = [
+    'Board',
+    'GameState',
+    'Move',
+    'symmetric_point',
+]
+
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
+# Legality flags of an empty point for one color.
+LEGAL = 1
+CAPTURES = 2
+
+PLAYERS = (None, Player.black, Player.white, None)
+
+# Identity, rotations by 90, 180 and 270 degrees, then the mirror images
+# across the middle column, the middle row and the two diagonals.
+NUM_SYMMETRIES = 8
+
+geometry_tables = {}
+
+
+def symmetric_point(point, symmetry, num_rows, num_cols):
+    """Image of a point under one of the board symmetries
+
+    A non-square board has only four symmetries; the ones that swap rows
+    and columns (1, 3, 6 and 7) leave its points in place.
+
+    Args:
+        point:
+        symmetry: 0 to NUM_SYMMETRIES - 1
+        num_rows:
+        num_cols:
+
+    Returns:
+        Point
+
+    """
+    if num_rows != num_cols and symmetry in (1, 3, 6, 7):
+        return point
+    row, col = point
+    mirror_row = num_rows + 1 - row
+    mirror_col = num_cols + 1 - col
+    return Point(*(
+        (row, col), (col, mirror_row), (mirror_row, mirror_col),
+        (mirror_col, row), (row, mirror_col), (mirror_row, col),
+        (col, row), (mirror_col, mirror_row))[symmetry])
+
+
+class Geometry:
+    """Index tables shared by every board of the same size
+
+    Args:
+        num_rows:
+        num_cols:
+
+    """
+    def __init__(self, num_rows, num_cols):
+        self.stride = num_cols + 2
+        self.size = (num_rows + 2) * self.stride
+        self.colors = bytearray([BORDER]) * self.size
+        self.points = [None] * self.size
+        self.neighbors = [()] * self.size
+        self.corners = [()] * self.size
+        # Per-color Zobrist deltas: placing a stone swaps the empty-point
+        # code for the stone code, exactly as goboard_fast does.
+        self.hash_codes = ([0] * self.size, [0] * self.size, [0] * self.size)
+        self.on_board = []
+
+        stride = self.stride
+        codes = zobrist.board_codes(num_rows, num_cols)
+        for row in range(1, num_rows + 1):
+            for col in range(1, num_cols + 1):
+                idx = row * stride + col
+                point = Point(row=row, col=col)
+                self.colors[idx] = EMPTY
+                self.points[idx] = point
+                self.on_board.append(idx)
+                empty_code = codes[3 * idx]
+                self.hash_codes[BLACK][idx] = \
+                    codes[3 * idx + BLACK] ^ empty_code
+                self.hash_codes[WHITE][idx] = \
+                    codes[3 * idx + WHITE] ^ empty_code
+
+        for idx in self.on_board:
+            self.neighbors[idx] = tuple(
+                n for n in (idx - stride, idx + stride, idx - 1, idx + 1)
+                if self.colors[n] != BORDER)
+            self.corners[idx] = tuple(
+                n for n in (idx - stride - 1, idx - stride + 1,
+                            idx + stride - 1, idx + stride + 1)
+                if self.colors[n] != BORDER)
+
+        # Per-color Zobrist deltas of every point's images under the
+        # symmetries, one tuple per point, for the hashes of the rotated
+        # and mirrored positions.
+        self.symmetric_codes = ([()] * self.size, [()] * self.size,
+                                [()] * self.size)
+        for idx in self.on_board:
+            images = []
+            for symmetry in range(NUM_SYMMETRIES):
+                image = symmetric_point(
+                    self.points[idx], symmetry, num_rows, num_cols)
+                images.append(image.row * stride + image.col)
+            for color in (BLACK, WHITE):
+                self.symmetric_codes[color][idx] = tuple(
+                    self.hash_codes[color][image] for image in images)
+
+
+def get_geometry(dim):
+    """Index tables for a board size, built once per size
+
+    Args:
+        dim: (num_rows, num_cols)
+
+    Returns:
+        Geometry
+
+    """
+    if dim not in geometry_tables:
+        geometry_tables[dim] = Geometry(*dim)
+    return geometry_tables[dim]
+
+
+class Board:
+    """Board over flat arrays
+
+    Args:
+        num_rows:
+        num_cols:
+
+    """
+    def __init__(self, num_rows, num_cols):
+        self.num_rows = num_rows
+        self.num_cols = num_cols
+        self._geometry = get_geometry((num_rows, num_cols))
+        size = self._geometry.size
+        self._stride = self._geometry.stride
+        self._neighbors = self._geometry.neighbors
+        # Point contents: EMPTY, BLACK, WHITE or BORDER.
+        self._color = bytearray(self._geometry.colors)
+        # String id (index of the head stone) for every stone, 0 elsewhere.
+        self._chain = array.array('i', [0]) * size
+        # Next stone of the same string, as a circular linked list.
+        self._next = array.array('i', [0]) * size
+        # Liberty and stone counts and the XOR of the stones' Zobrist
+        # codes, valid at string heads only.
+        self._libs = array.array('i', [0]) * size
+        self._size = array.array('i', [0]) * size
+        self._string_hash = array.array('q', [0]) * size
+        self._hash = zobrist.EMPTY_BOARD
+        # Hashes of the position under every symmetry, the first being
+        # _hash itself, or None until symmetric_hashes or canonical_hash
+        # first asks for them; from then on moves keep them up to date.
+        # The list is replaced, never changed in place, so copies and the
+        # journal can share it.
+        self._symmetric_hashes = None
+        # Stones on the board per color, indexed by BLACK and WHITE.
+        self._num_stones = array.array('i', [0, 0, 0])
+        # One (point, previous hash, captured stones, previous symmetric
+        # hashes) entry per play().
+        self._journal = []
+        # Empty points in no particular order; _empty_pos locates each
+        # one in the list so that it can be swapped out in O(1).
+        on_board = self._geometry.on_board
+        self._empty = array.array('i', on_board)
+        self._empty_pos = array.array('i', [0]) * size
+        for pos, idx in enumerate(on_board):
+            self._empty_pos[idx] = pos
+        self._num_empty = len(on_board)
+        # Per-color LEGAL/CAPTURES flags of the empty points, or None until
+        # legal_points first asks for them; from then on moves mark the
+        # points they may affect as dirty, and flags are refreshed from
+        # there on demand. Boards nobody lists legal points of, such as
+        # playout boards, skip that bookkeeping.
+        self._legal = None
+        self._dirty = None
+
+    def _index(self, point):
+        return point.row * self._stride + point.col
+
+    def neighbors(self, point):
+        points = self._geometry.points
+        return [points[n] for n in self._neighbors[self._index(point)]]
+
+    def corners(self, point):
+        points = self._geometry.points
+        return [points[n] for n in self._geometry.corners[self._index(point)]]
+
+    def place_stone(self, player, point):
+        """Place a stone and resolve merges and captures
+
+        Args:
+            player:
+            point:
+
+        Returns:
+            None
+
+        """
+        assert self.is_on_grid(point)
+        idx = self._index(point)
+        assert self._color[idx] == EMPTY
+        self._place(BLACK if player is Player.black else WHITE, idx)
+
+    def play(self, player, point):
+        """Place a stone in place, journaling the change so that ``undo``
+        can take it back. Search code can walk down and back up a line
+        this way without copying the board.
+
+        Args:
+            player:
+            point:
+
+        Returns:
+            number of captured stones
+
+        """
+        assert self.is_on_grid(point)
+        idx = self._index(point)
+        assert self._color[idx] == EMPTY
+        previous_hash = self._hash
+        previous_symmetric_hashes = self._symmetric_hashes
+        captured = self._place(
+            BLACK if player is Player.black else WHITE, idx)
+        self._journal.append((
+            idx, previous_hash, tuple(captured), previous_symmetric_hashes))
+        return len(captured)
+
+    def undo(self):
+        """Take back the most recent ``play``
+
+        Only the played point and the captured stones are journaled: the
+        strings merged by the move fall apart again once the stone is
+        lifted, so they are rebuilt from the restored position.
+
+        Returns:
+            None
+
+        """
+        idx, previous_hash, captured, previous_symmetric_hashes = \
+            self._journal.pop()
+        colors = self._color
+        chain = self._chain
+        libs = self._libs
+        color = colors[idx]
+        other = BLACK + WHITE - color
+
+        for stone in self._stones(chain[idx]):
+            chain[stone] = 0
+        colors[idx] = EMPTY
+        self._add_empty(idx)
+        for stone in captured:
+            colors[stone] = other
+            self._remove_empty(stone)
+        self._num_stones[color] -= 1
+        self._num_stones[other] += len(captured)
+        tracking = self._dirty is not None
+        if tracking:
+            self._dirty.add(idx)
+            self._dirty.update(self._neighbors[idx])
+            self._dirty.update(captured)
+
+        rebuilt = set()
+        for stone in captured:
+            if not chain[stone]:
+                rebuilt.add(self._rebuild_string(stone))
+        # Opponent strings next to the move get their liberty back.
+        counted = []
+        for neighbor in self._neighbors[idx]:
+            if colors[neighbor] != other:
+                continue
+            head = chain[neighbor]
+            if head not in rebuilt and head not in counted:
+                counted.append(head)
+                libs[head] += 1
+                if tracking and libs[head] == 2:
+                    self._mark_liberties(head)
+        # Split whatever the stone had joined back into its strings.
+        for neighbor in self._neighbors[idx]:
+            if colors[neighbor] == color and not chain[neighbor]:
+                rebuilt.add(self._rebuild_string(neighbor))
+        # Other friendly strings lose the liberties the capture gave them.
+        for stone in captured:
+            counted = []
+            for neighbor in self._neighbors[stone]:
+                if colors[neighbor] != color:
+                    continue
+                head = chain[neighbor]
+                if head not in rebuilt and head not in counted:
+                    counted.append(head)
+                    libs[head] -= 1
+                    if tracking and libs[head] == 1:
+                        self._mark_liberties(head)
+        self._hash = previous_hash
+        self._symmetric_hashes = previous_symmetric_hashes
+
+    def _rebuild_string(self, start):
+        """Relabel the unlabelled string through ``start`` from scratch
+
+        Returns:
+            head of the rebuilt string
+
+        """
+        colors = self._color
+        chain = self._chain
+        nxt = self._next
+        neighbors = self._neighbors
+        color = colors[start]
+        chain[start] = start
+        stones = [start]
+        liberties = set()
+        for stone in stones:
+            for neighbor in neighbors[stone]:
+                neighbor_color = colors[neighbor]
+                if neighbor_color == EMPTY:
+                    liberties.add(neighbor)
+                elif neighbor_color == color and not chain[neighbor]:
+                    chain[neighbor] = start
+                    stones.append(neighbor)
+        hash_codes = self._geometry.hash_codes[color]
+        string_hash = 0
+        for stone, following in zip(stones, stones[1:] + stones[:1]):
+            nxt[stone] = following
+            string_hash ^= hash_codes[stone]
+        self._size[start] = len(stones)
+        self._libs[start] = len(liberties)
+        self._string_hash[start] = string_hash
+        if self._dirty is not None:
+            self._dirty.update(liberties)
+        return start
+
+    def _place(self, color, idx):
+        """Place a stone of ``color`` on the empty index ``idx``
+
+        Returns:
+            list of captured stones
+
+        """
+        colors = self._color
+        chain = self._chain
+        libs = self._libs
+        dirty = self._dirty
+        tracking = dirty is not None
+
+        colors[idx] = color
+        chain[idx] = idx
+        self._next[idx] = idx
+        self._size[idx] = 1
+        code = self._geometry.hash_codes[color][idx]
+        self._string_hash[idx] = code
+        self._hash ^= code
+        if self._symmetric_hashes is not None:
+            self._symmetric_hashes = [
+                symmetric_hash ^ symmetric_code
+                for symmetric_hash, symmetric_code in zip(
+                    self._symmetric_hashes,
+                    self._geometry.symmetric_codes[color][idx])]
+        self._remove_empty(idx)
+        if tracking:
+            dirty.add(idx)
+
+        num_libs = 0
+        friends = []
+        enemies = []
+        for neighbor in self._neighbors[idx]:
+            neighbor_color = colors[neighbor]
+            if neighbor_color == EMPTY:
+                num_libs += 1
+                if tracking:
+                    dirty.add(neighbor)
+                continue
+            head = chain[neighbor]
+            if neighbor_color == color:
+                if head not in friends:
+                    friends.append(head)
+            elif head not in enemies:
+                enemies.append(head)
+        libs[idx] = num_libs
+        # Legality around a string only depends on whether it is in
+        # atari, so far-away liberties are dirtied only when that flips.
+        if tracking:
+            joined_in_atari = [libs[head] == 1 for head in friends]
+
+        # The new stone takes one liberty from every adjacent string.
+        for head in friends:
+            libs[head] -= 1
+        for head in enemies:
+            libs[head] -= 1
+            if tracking and libs[head] == 1:
+                self._mark_liberties(head)
+
+        if len(friends) == 1:
+            head = friends[0]
+            libs[head] += self._new_liberties(idx, head)
+            self._merge(head, idx)
+        elif friends:
+            head = idx
+            for friend in friends:
+                head = self._merge(head, friend)
+            libs[head] = self._count_liberties(head)
+        if tracking and friends and any(
+                in_atari != (libs[head] == 1) for in_atari in joined_in_atari):
+            self._mark_liberties(head)
+
+        captured = []
+        for head in enemies:
+            if libs[head] == 0:
+                captured.extend(self._remove_string(head))
+        self._num_stones[color] += 1
+        self._num_stones[BLACK + WHITE - color] -= len(captured)
+        return captured
+
+    def _new_liberties(self, idx, head):
+        """Count empty neighbours of ``idx`` that are not yet liberties of the
+        string ``head``
+
+        """
+        colors = self._color
+        chain = self._chain
+        neighbors = self._neighbors
+        count = 0
+        for liberty in neighbors[idx]:
+            if colors[liberty] != EMPTY:
+                continue
+            for n in neighbors[liberty]:
+                if n != idx and chain[n] == head:
+                    break
+            else:
+                count += 1
+        return count
+
+    def _merge(self, first, second):
+        """Join two strings, relabelling the smaller one
+
+        Returns:
+            head of the merged string
+
+        """
+        size = self._size
+        if size[first] < size[second]:
+            first, second = second, first
+        chain = self._chain
+        nxt = self._next
+        stone = second
+        while True:
+            chain[stone] = first
+            stone = nxt[stone]
+            if stone == second:
+                break
+        nxt[first], nxt[second] = nxt[second], nxt[first]
+        size[first] += size[second]
+        self._string_hash[first] ^= self._string_hash[second]
+        return first
+
+    def _count_liberties(self, head):
+        colors = self._color
+        neighbors = self._neighbors
+        nxt = self._next
+        seen = set()
+        stone = head
+        while True:
+            for n in neighbors[stone]:
+                if colors[n] == EMPTY:
+                    seen.add(n)
+            stone = nxt[stone]
+            if stone == head:
+                break
+        return len(seen)
+
+    def _stones(self, head):
+        nxt = self._next
+        stones = [head]
+        stone = nxt[head]
+        while stone != head:
+            stones.append(stone)
+            stone = nxt[stone]
+        return stones
+
+    def _remove_string(self, head):
+        """Take a string off the board, giving liberties back to its neighbours
+
+        Returns:
+            list of removed stones
+
+        """
+        colors = self._color
+        chain = self._chain
+        libs = self._libs
+        hash_codes = self._geometry.hash_codes[colors[head]]
+        symmetric_codes = self._geometry.symmetric_codes[colors[head]]
+        symmetric_hashes = self._symmetric_hashes
+        stones = self._stones(head)
+        for stone in stones:
+            colors[stone] = EMPTY
+            chain[stone] = 0
+            self._hash ^= hash_codes[stone]
+            if symmetric_hashes is not None:
+                symmetric_hashes = [
+                    symmetric_hash ^ symmetric_code
+                    for symmetric_hash, symmetric_code in zip(
+                        symmetric_hashes, symmetric_codes[stone])]
+            self._add_empty(stone)
+        self._symmetric_hashes = symmetric_hashes
+        tracking = self._dirty is not None
+        if tracking:
+            self._dirty.update(stones)
+        gained = {}
+        for stone in stones:
+            # Every removed stone is a new liberty for each distinct
+            # string around it.
+            counted = []
+            for neighbor in self._neighbors[stone]:
+                neighbor_head = chain[neighbor]
+                if neighbor_head and neighbor_head not in counted:
+                    counted.append(neighbor_head)
+                    gained.setdefault(neighbor_head, libs[neighbor_head])
+                    libs[neighbor_head] += 1
+        if tracking:
+            for neighbor_head, old_libs in gained.items():
+                if old_libs == 1:
+                    self._mark_liberties(neighbor_head)
+        return stones
+
+    def _mark_liberties(self, head):
+        colors = self._color
+        neighbors = self._neighbors
+        nxt = self._next
+        dirty = self._dirty
+        stone = head
+        while True:
+            for n in neighbors[stone]:
+                if colors[n] == EMPTY:
+                    dirty.add(n)
+            stone = nxt[stone]
+            if stone == head:
+                break
+
+    def _add_empty(self, idx):
+        self._empty_pos[idx] = self._num_empty
+        self._empty[self._num_empty] = idx
+        self._num_empty += 1
+
+    def _remove_empty(self, idx):
+        self._num_empty -= 1
+        last = self._empty[self._num_empty]
+        pos = self._empty_pos[idx]
+        self._empty[pos] = last
+        self._empty_pos[last] = pos
+
+    def _update_legality(self):
+        """Refresh the legality flags of the dirty points, building them
+        for every point the first time"""
+        if self._dirty is None:
+            size = self._geometry.size
+            self._legal = (None, bytearray(size), bytearray(size))
+            self._dirty = set(self._empty[:self._num_empty])
+        colors = self._color
+        black = self._legal[BLACK]
+        white = self._legal[WHITE]
+        for idx in self._dirty:
+            if colors[idx] == EMPTY:
+                black[idx] = self._legality(BLACK, idx)
+                white[idx] = self._legality(WHITE, idx)
+            else:
+                black[idx] = white[idx] = 0
+        self._dirty.clear()
+
+    def _legality(self, color, idx):
+        """Legality flags of a play on the empty index ``idx``
+
+        Returns:
+            0 for self capture, else LEGAL, with CAPTURES if stones are taken
+
+        """
+        colors = self._color
+        chain = self._chain
+        libs = self._libs
+        flags = 0
+        for neighbor in self._neighbors[idx]:
+            neighbor_color = colors[neighbor]
+            if neighbor_color == EMPTY:
+                flags |= LEGAL
+            elif neighbor_color == color:
+                if libs[chain[neighbor]] > 1:
+                    flags |= LEGAL
+            elif libs[chain[neighbor]] == 1:
+                flags |= LEGAL | CAPTURES
+        return flags
+
+    def _flags(self, player, point):
+        color = BLACK if player is Player.black else WHITE
+        idx = point.row * self._stride + point.col
+        if self._dirty is None:
+            return self._legality(color, idx)
+        if self._dirty:
+            self._update_legality()
+        return self._legal[color][idx]
+
+    def legal_points(self, player):
+        """Empty points where a play would not be self capture
+
+        Ko is left to the game state. The first call examines every empty
+        point; later ones only the points around changes made since.
+
+        Args:
+            player:
+
+        Returns:
+            list of Point
+
+        """
+        if self._dirty is None or self._dirty:
+            self._update_legality()
+        legal = self._legal[BLACK if player is Player.black else WHITE]
+        points = self._geometry.points
+        return [
+            points[idx] for idx in self._empty[:self._num_empty]
+            if legal[idx]]
+
+    def is_self_capture(self, player, point):
+        """Whether a play on the empty point would leave its own string
+        without liberties
+        """
+        return not self._flags(player, point)
+
+    def will_capture(self, player, point):
+        """Whether a play on the empty point would capture"""
+        return bool(self._flags(player, point) & CAPTURES)
+
+    def next_zobrist_hash(self, player, point):
+        """Hash the board would have after a play, computed from string data
+        without placing the stone
+
+        Args:
+            player:
+            point:
+
+        Returns:
+            Zobrist hash
+
+        """
+        color = BLACK if player is Player.black else WHITE
+        idx = point.row * self._stride + point.col
+        colors = self._color
+        chain = self._chain
+        libs = self._libs
+        next_hash = self._hash ^ self._geometry.hash_codes[color][idx]
+        captured = []
+        for neighbor in self._neighbors[idx]:
+            neighbor_color = colors[neighbor]
+            if neighbor_color == EMPTY or neighbor_color == color:
+                continue
+            head = chain[neighbor]
+            if libs[head] == 1 and head not in captured:
+                # Lifting a string undoes the codes of all its stones.
+                captured.append(head)
+                next_hash ^= self._string_hash[head]
+        return next_hash
+
+    def is_on_grid(self, point):
+        return 1 <= point.row <= self.num_rows and \
+            1 <= point.col <= self.num_cols
+
+    def get(self, point):
+        """Return the content of a point on the board.
+        Returns None if the point is empty, or a Player if there is a
+        stone on that point.
+        """
+        return PLAYERS[self._color[point.row * self._stride + point.col]]
+
+    def _is_eye(self, color, idx):
+        """Whether the empty index is an eye of ``color``: all its
+        neighbours are friendly stones, and so are all its corners on the
+        edge, or three of four in the middle of the board"""
+        colors = self._color
+        for neighbor in self._neighbors[idx]:
+            if colors[neighbor] != color:
+                return False
+        corners = self._geometry.corners[idx]
+        friendly_corners = 0
+        for corner in corners:
+            if colors[corner] == color:
+                friendly_corners += 1
+        if len(corners) < 4:
+            return len(corners) == friendly_corners
+        return friendly_corners >= 3
+
+    def is_point_an_eye(self, point, color):
+        """Whether the point is an empty eye of ``color``
+
+        Same rule as ``dlgo.agent.helpers.is_point_an_eye``, on the index
+        tables of the board.
+
+        Args:
+            point:
+            color: Player
+
+        Returns:
+            bool
+
+        """
+        idx = self._index(point)
+        return self._color[idx] == EMPTY and \
+            self._is_eye(BLACK if color is Player.black else WHITE, idx)
+
+    def eye_points(self, color):
+        """All the empty points that are eyes of ``color``, checked in one
+        pass over the list of empty points
+
+        Args:
+            color: Player
+
+        Returns:
+            list of Point
+
+        """
+        color = BLACK if color is Player.black else WHITE
+        points = self._geometry.points
+        return [
+            points[idx] for idx in self._empty[:self._num_empty]
+            if self._is_eye(color, idx)]
+
+    def colors(self):
+        """Colour of every index of the padded layout, as bytes"""
+        return bytes(self._color)
+
+    def stone_counts(self):
+        """Number of black and white stones on the board
+
+        Returns:
+            (black, white)
+
+        """
+        return self._num_stones[BLACK], self._num_stones[WHITE]
+
+    def eye_area(self):
+        """Area counts of a board whose empty points are all single-point
+        eyes, as at the end of a random playout
+
+        Only the empty points are looked at; the stones come from the
+        running counts.
+
+        Returns:
+            (black, white) stones plus surrounded points, or None if some
+            empty point touches another empty point or both colours
+
+        """
+        colors = self._color
+        neighbors = self._neighbors
+        empty = self._empty
+        area = [0, self._num_stones[BLACK], self._num_stones[WHITE]]
+        for pos in range(self._num_empty):
+            owner = EMPTY
+            for neighbor in neighbors[empty[pos]]:
+                neighbor_color = colors[neighbor]
+                if neighbor_color == EMPTY or \
+                        (owner != EMPTY and neighbor_color != owner):
+                    return None
+                owner = neighbor_color
+            if owner == EMPTY:
+                return None
+            area[owner] += 1
+        return area[BLACK], area[WHITE]
+
+    def get_go_string(self, point):
+        """Return the entire string of stones at a point.
+        Returns None if the point is empty, or a GoString snapshot if
+        there is a stone on that point.
+        """
+        head = self._chain[self._index(point)]
+        if not head:
+            return None
+        points = self._geometry.points
+        stones = self._stones(head)
+        liberties = set()
+        for stone in stones:
+            for n in self._neighbors[stone]:
+                if self._color[n] == EMPTY:
+                    liberties.add(points[n])
+        return GoString(
+            PLAYERS[self._color[head]],
+            [points[stone] for stone in stones],
+            liberties)
+
+    def __eq__(self, other):
+        return isinstance(other, Board) and \
+            self.num_rows == other.num_rows and \
+            self.num_cols == other.num_cols and \
+            self._color == other._color
+
+    def __deepcopy__(self, memodict={}):
+        copied = Board.__new__(Board)
+        copied._copy_from(self)
+        return copied
+
+    def __getstate__(self):
+        # The shared index tables are looked up again when unpickling.
+        state = self.__dict__.copy()
+        del state['_geometry']
+        del state['_neighbors']
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._geometry = get_geometry((self.num_rows, self.num_cols))
+        self._neighbors = self._geometry.neighbors
+
+    def _copy_from(self, other):
+        self.__dict__.update(other.__dict__)
+        self._color = other._color[:]
+        self._chain = other._chain[:]
+        self._next = other._next[:]
+        self._libs = other._libs[:]
+        self._size = other._size[:]
+        self._string_hash = other._string_hash[:]
+        self._empty = other._empty[:]
+        self._empty_pos = other._empty_pos[:]
+        self._num_stones = other._num_stones[:]
+        if other._dirty is not None:
+            self._legal = (
+                None, other._legal[BLACK][:], other._legal[WHITE][:])
+            self._dirty = set(other._dirty)
+        self._journal = other._journal[:]
+
+    def zobrist_hash(self):
+        return self._hash
+
+    def symmetric_hashes(self):
+        """Zobrist hashes of the position under every board symmetry, in
+        the order of ``symmetric_point``; the first is ``zobrist_hash()``
+
+        Returns:
+            tuple of NUM_SYMMETRIES ints
+
+        """
+        if self._symmetric_hashes is None:
+            self._build_symmetric_hashes()
+        return tuple(self._symmetric_hashes)
+
+    def canonical_hash(self):
+        """Hash shared by all rotations and mirror images of the position:
+        the smallest of its symmetric hashes
+
+        Returns:
+            Zobrist hash
+
+        """
+        if self._symmetric_hashes is None:
+            self._build_symmetric_hashes()
+        return min(self._symmetric_hashes)
+
+    def _build_symmetric_hashes(self):
+        colors = self._color
+        symmetric_codes = self._geometry.symmetric_codes
+        hashes = [zobrist.EMPTY_BOARD] * NUM_SYMMETRIES
+        for idx in self._geometry.on_board:
+            color = colors[idx]
+            if color != EMPTY:
+                hashes = [
+                    symmetric_hash ^ symmetric_code
+                    for symmetric_hash, symmetric_code in zip(
+                        hashes, symmetric_codes[color][idx])]
+        self._symmetric_hashes = hashes
+
+
+class GameState(goboard_fast.GameState):
+    """Game state over the array board
+
+    Everything but the move generation is inherited from
+    ``goboard_fast.GameState``, which works on any board with the same
+    interface.
+
+    """
+    board_class = Board
+
+    def legal_moves(self):
+        if self.is_over():
+            return []
+        moves = []
+        for point in self.board.legal_points(self.next_player):
+            move = Move.play(point)
+            if not self.does_move_violate_ko(self.next_player, move):
+                moves.append(move)
+        # These two moves are always legal.
+        moves.append(Move.pass_turn())
+        moves.append(Move.resign())
+
+        return moves
@@ -1,6 +1,8 @@
 import copy
 
 from dlgo.gotypes import Player, Point
+from dlgo.history import SituationHistory
+from dlgo.rules import DEFAULT_RULES, POSITIONAL, SIMPLE
 from dlgo.scoring import compute_game_result
 from dlgo import zobrist
 from dlgo.utils import MoveAge
@@ -98,6 +100,8 @@ class Board():
         self.num_cols = num_cols
         self._grid = {}
         self._hash = zobrist.EMPTY_BOARD
+        self._stride = num_cols + 2
+        self._codes = zobrist.board_codes(num_rows, num_cols)
 
         global neighbor_tables
         dim = (num_rows, num_cols)
@@ -144,10 +148,9 @@ class Board():
             new_string = new_string.merged_with(same_color_string)
         for new_string_point in new_string.stones:
             self._grid[new_string_point] = new_string
-        # Remove empty-point hash code.
-        self._hash ^= zobrist.HASH_CODE[point, None]
-        # Add filled point hash code.
-        self._hash ^= zobrist.HASH_CODE[point, player]
+        # Swap the empty-point hash code for the filled point one.
+        base = 3 * (point.row * self._stride + point.col)
+        self._hash ^= self._codes[base] ^ self._codes[base + player.value]
 
 
         # 2. Reduce liberties of any adjacent strings of the opposite
@@ -166,6 +169,8 @@ class Board():
             self._grid[point] = new_string
 
     def _remove_string(self, string):
+        codes = self._codes
+        color = string.color.value
         for point in string.stones:
             self.move_ages.reset_age(point)
             # Removing a string can create liberties for other strings.
@@ -176,10 +181,9 @@ class Board():
                 if neighbor_string is not string:
                     self._replace_string(neighbor_string.with_liberty(point))
             self._grid[point] = None
-            # Remove filled point hash code.
-            self._hash ^= zobrist.HASH_CODE[point, string.color]
-            # Add empty point hash code.
-            self._hash ^= zobrist.HASH_CODE[point, None]
+            # Swap the filled point hash code back for the empty one.
+            base = 3 * (point.row * self._stride + point.col)
+            self._hash ^= codes[base + color] ^ codes[base]
 
     def is_self_capture(self, player, point):
         friendly_strings = []
@@ -212,6 +216,28 @@ class Board():
                     return True
         return False
 
+    def next_zobrist_hash(self, player, point):
+        """Return the hash the board would have after player plays at
+        point, without placing the stone.
+        """
+        codes = self._codes
+        stride = self._stride
+        base = 3 * (point.row * stride + point.col)
+        next_hash = self._hash ^ codes[base] ^ codes[base + player.value]
+        captured = []
+        for neighbor in self.neighbor_table[point]:
+            neighbor_string = self._grid.get(neighbor)
+            if neighbor_string is None or neighbor_string.color == player:
+                continue
+            if neighbor_string.num_liberties == 1 and \
+                    neighbor_string not in captured:
+                captured.append(neighbor_string)
+                color = neighbor_string.color.value
+                for stone in neighbor_string.stones:
+                    base = 3 * (stone.row * stride + stone.col)
+                    next_hash ^= codes[base] ^ codes[base + color]
+        return next_hash
+
     def is_on_grid(self, point):
         return 1 <= point.row <= self.num_rows and \
             1 <= point.col <= self.num_cols
@@ -248,6 +274,7 @@ class Board():
         # (immutable) to GoStrings (also immutable)
         copied._grid = copy.copy(self._grid)
         copied._hash = self._hash
+        copied.move_ages = self.move_ages.copy()
         return copied
 
 # tag::return_zobrist[]
@@ -307,18 +334,49 @@ class Move():
 
 
 class GameState():
-    def __init__(self, board, next_player, previous, move):
+    # Board implementation of new games; subclasses over other boards
+    # replace it.
+    board_class = Board
+
+    def __init__(self, board, next_player, previous, move,
+                 rules=DEFAULT_RULES):
         self.board = board
         self.next_player = next_player
         self.previous_state = previous
         if previous is None:
-            self.previous_states = frozenset()
+            self.rules = rules
+            # Simple ko only looks one move back, so no history is kept.
+            self.history = None if rules.ko == SIMPLE else SituationHistory()
+            self.move_number = 0
         else:
-            self.previous_states = frozenset(
-                previous.previous_states |
-                {(previous.next_player, previous.board.zobrist_hash())})
+            self.rules = previous.rules
+            self.history = previous.history
+            self.move_number = previous.move_number + 1
+        if self.history is not None:
+            self.history.add(self)
         self.last_move = move
 
+    def __reduce__(self):
+        # Pickle the line of play as its first state plus the moves
+        # played, rather than as a deeply nested chain of states.
+        moves = []
+        start = self
+        while start.previous_state is not None:
+            moves.append(start.last_move)
+            start = start.previous_state
+        moves.reverse()
+        return (
+            self._replay,
+            (start.board, start.next_player, start.last_move, moves,
+             self.rules))
+
+    @classmethod
+    def _replay(cls, board, next_player, move, moves, rules=DEFAULT_RULES):
+        game = cls(board, next_player, None, move, rules)
+        for move in moves:
+            game = game.apply_move(move)
+        return game
+
     def apply_move(self, move):
         """Return the new GameState after applying the move."""
         if move.is_play:
@@ -326,14 +384,14 @@ class GameState():
             next_board.place_stone(self.next_player, move.point)
         else:
             next_board = self.board
-        return GameState(next_board, self.next_player.other, self, move)
+        return type(self)(next_board, self.next_player.other, self, move)
 
     @classmethod
-    def new_game(cls, board_size):
+    def new_game(cls, board_size, rules=DEFAULT_RULES):
         if isinstance(board_size, int):
             board_size = (board_size, board_size)
-        board = Board(*board_size)
-        return GameState(board, Player.black, None, None)
+        board = cls.board_class(*board_size)
+        return cls(board, Player.black, None, None, rules)
 
     def is_move_self_capture(self, player, move):
         if not move.is_play:
@@ -349,10 +407,19 @@ class GameState():
             return False
         if not self.board.will_capture(player, move.point):
             return False
-        next_board = copy.deepcopy(self.board)
-        next_board.place_stone(player, move.point)
-        next_situation = (player.other, next_board.zobrist_hash())
-        return next_situation in self.previous_states
+        next_hash = self.board.next_zobrist_hash(player, move.point)
+        ko = self.rules.ko
+        if ko == SIMPLE:
+            # Only retaking a ko at once can bring back the board from
+            # before the opponent's last move.
+            previous = self.previous_state
+            return previous is not None and \
+                previous.board.zobrist_hash() == next_hash
+        if ko == POSITIONAL:
+            return self.history.occurred_before(
+                self, (player, next_hash)) or \
+                self.history.occurred_before(self, (player.other, next_hash))
+        return self.history.occurred_before(self, (player.other, next_hash))
 
     def is_valid_move(self, move):
         if self.is_over():
@@ -0,0 +1,73 @@
+"""Game history module
+
+"""
+import weakref
+
+
+class SituationHistory:
+    """Situations reached along every line of one game
+
+    All game states descending from one ``new_game`` share a single table
+    mapping each situation ``(next_player, zobrist_hash)`` to the states that
+    reached it. Recording a state is a dict append, and asking whether a
+    situation occurred earlier on a line is a dict lookup: only when some
+    state in the game tree reached that situation is it checked to be an
+    ancestor, which for ko fights means walking back a few moves.
+
+    States are held through weak references, so discarded branches of a
+    search tree drop out of the table on their own.
+
+    """
+    def __init__(self):
+        self._states = {}
+
+    def add(self, game_state):
+        """Record the situation of a new game state
+
+        Args:
+            game_state: state with ``move_number`` and ``previous_state``
+
+        Returns:
+            None
+
+        """
+        situation = (game_state.next_player, game_state.board.zobrist_hash())
+        states = self._states
+
+        def forget(ref):
+            refs = states.get(situation)
+            if refs is not None:
+                refs.remove(ref)
+                if not refs:
+                    del states[situation]
+
+        refs = states.get(situation)
+        if refs is None:
+            refs = states[situation] = []
+        refs.append(weakref.ref(game_state, forget))
+
+    def occurred_before(self, game_state, situation):
+        """Whether a situation was reached by an ancestor of a game state
+
+        Args:
+            game_state:
+            situation: (next_player, zobrist_hash)
+
+        Returns:
+            bool
+
+        """
+        refs = self._states.get(situation)
+        if not refs:
+            return False
+        for ref in refs:
+            candidate = ref()
+            if candidate is None or \
+                    candidate.move_number >= game_state.move_number:
+                continue
+            ancestor = game_state
+            while ancestor.move_number > candidate.move_number:
+                ancestor = ancestor.previous_state
+            if ancestor is candidate:
+                return True
+        return False
@@ -0,0 +1,253 @@
+"""Playout engine module
+
+Plays a game out to the end on a private mutable copy of the position, for
+Monte Carlo rollouts. The copy is taken once; moves are made in place on the
+flat arrays of ``goboard_array`` and only simple ko is enforced. Finished
+games are scored by area, with the komi of the game's ruleset.
+
+A move policy is any callable ``policy(board, color, ko)`` returning the index
+of the point to play on ``board``, or ``None`` to pass. ``color`` is
+``goboard_array.BLACK`` or ``goboard_array.WHITE`` and ``ko`` is the index
+that may not be played this turn (0 if there is none).
+
+"""
+import random
+
+from dlgo.goboard_array import BLACK, PLAYERS, WHITE, Board
+from dlgo.gotypes import Player
+from dlgo.rules import get_rules
+from dlgo.scoring import compute_board_result
+
+__all__ = [
+    'PlayoutBoard',
+    'encode_position',
+    'random_policy',
+    'simulate_board',
+    'simulate_game',
+    'simulate_position',
+]
+
+
+class PlayoutBoard(Board):
+    """Array board with the index-level operations used by playouts
+
+    Neither the legality flags nor the symmetric hashes of the board are
+    taken over, as playouts never read them: ``is_legal`` checks the point
+    it is asked about directly.
+
+    Args:
+        board: position to copy, from any board implementation
+
+    """
+    def __init__(self, board):
+        if isinstance(board, Board):
+            self._copy_from(board)
+            self._journal = []
+            self._symmetric_hashes = None
+            self._legal = None
+            self._dirty = None
+            return
+        Board.__init__(self, board.num_rows, board.num_cols)
+        # Stones of a legal position can be laid down in any order
+        # without capturing each other.
+        for idx in self._geometry.on_board:
+            stone = board.get(self._geometry.points[idx])
+            if stone is not None:
+                self.place_stone(stone, self._geometry.points[idx])
+
+    @classmethod
+    def from_colors(cls, num_rows, num_cols, colors):
+        """Board from the bytes of ``colors()``"""
+        board = cls.__new__(cls)
+        Board.__init__(board, num_rows, num_cols)
+        for idx, color in enumerate(colors):
+            if color == BLACK or color == WHITE:
+                board.place_stone(PLAYERS[color], board.point(idx))
+        return board
+
+    def index(self, point):
+        return self._index(point)
+
+    def point(self, idx):
+        return self._geometry.points[idx]
+
+    def empty_indices(self):
+        """Copy of the list of empty points, in no particular order"""
+        return self._empty[:self._num_empty]
+
+    def is_legal(self, color, idx):
+        """Whether a play on the empty index would not be self capture"""
+        return self._legality(color, idx) != 0
+
+    # is_eye(color, idx): whether the empty index is an eye of ``color``,
+    # by the rule of ``dlgo.agent.helpers.is_point_an_eye``.
+    is_eye = Board._is_eye
+
+    def play_index(self, color, idx):
+        """Play a stone on the empty index
+
+        Returns:
+            ko index the opponent may not retake at, or 0
+
+        """
+        captured = self._place(color, idx)
+        if len(captured) == 1:
+            head = self._chain[idx]
+            if self._size[head] == 1 and self._libs[head] == 1:
+                return captured[0]
+        return 0
+
+
+def random_policy(board, color, ko):
+    """Uniformly random legal move that does not fill an own eye
+
+    Empty points are drawn without replacement, so usually only one or two
+    of them get checked.
+
+    """
+    candidates = board.empty_indices()
+    remaining = len(candidates)
+    while remaining:
+        pick = int(random.random() * remaining)
+        idx = candidates[pick]
+        if idx != ko and board.is_legal(color, idx) and \
+                not board.is_eye(color, idx):
+            return idx
+        remaining -= 1
+        candidates[pick] = candidates[remaining]
+    return None
+
+
+def initial_ko(game_state):
+    """Point the next player may not play at because of a ko capture
+
+    Args:
+        game_state:
+
+    Returns:
+        Point or None
+
+    """
+    move = game_state.last_move
+    if move is None or not move.is_play or game_state.previous_state is None:
+        return None
+    string = game_state.board.get_go_string(move.point)
+    if len(string.stones) != 1 or len(string.liberties) != 1:
+        return None
+    liberty = next(iter(string.liberties))
+    captured = game_state.previous_state.board.get_go_string(liberty)
+    if captured is None or len(captured.stones) != 1:
+        return None
+    return liberty
+
+
+def encode_position(game_state):
+    """Compact picklable form of what a playout needs from a game state
+
+    Pickling a game state replays its moves; this is just the stones, the
+    player to move, the ko index, the number of passes in a row and the
+    komi.
+
+    Args:
+        game_state:
+
+    Returns:
+        tuple for ``simulate_position``
+
+    """
+    board = PlayoutBoard(game_state.board)
+    color = BLACK if game_state.next_player is Player.black else WHITE
+    ko_point = initial_ko(game_state)
+    ko = 0 if ko_point is None else board.index(ko_point)
+    last_move = game_state.last_move
+    passes = 1 if last_move is not None and last_move.is_pass else 0
+    return (
+        board.num_rows, board.num_cols, board.colors(), color, ko, passes,
+        get_rules(game_state).komi)
+
+
+def _play_out(board, color, ko, passes, komi, policy, max_moves, moves):
+    if max_moves is None:
+        max_moves = 3 * board.num_rows * board.num_cols
+
+    for _ in range(max_moves):
+        idx = policy(board, color, ko)
+        if idx is None:
+            passes += 1
+            if passes == 2:
+                break
+            ko = 0
+        else:
+            passes = 0
+            ko = board.play_index(color, idx)
+            if moves is not None:
+                moves.append((PLAYERS[color], board.point(idx)))
+        color = BLACK + WHITE - color
+
+    return compute_board_result(board, komi=komi)
+
+
+def simulate_game(game_state, policy=random_policy, max_moves=None,
+                  moves=None):
+    """Play the game out with ``policy`` and score the final position
+
+    Args:
+        game_state: position to start from; it is not modified
+        policy: move policy, see the module docstring
+        max_moves: playout length cap, three times the board area by
+            default, so that long ko cycles cannot run forever
+        moves: list to append the (player, point) of every stone played
+            to, in order
+
+    Returns:
+        GameResult
+
+    """
+    last_move = game_state.last_move
+    passes = 1 if last_move is not None and last_move.is_pass else 0
+    return simulate_board(
+        game_state.board, game_state.next_player, initial_ko(game_state),
+        passes, get_rules(game_state).komi, policy, max_moves, moves)
+
+
+def simulate_board(board, next_player, ko_point=None, passes=0, komi=7.5,
+                   policy=random_policy, max_moves=None, moves=None):
+    """``simulate_game`` from a bare position
+
+    Args:
+        board: any board implementation; it is not modified
+        next_player:
+        ko_point: point ``next_player`` may not retake a ko at
+        passes: passes in a row just before this position
+        komi:
+        policy:
+        max_moves:
+        moves:
+
+    Returns:
+        GameResult
+
+    """
+    board = PlayoutBoard(board)
+    color = BLACK if next_player is Player.black else WHITE
+    ko = 0 if ko_point is None else board.index(ko_point)
+    return _play_out(
+        board, color, ko, passes, komi, policy, max_moves, moves)
+
+
+def simulate_position(position, policy=random_policy, max_moves=None):
+    """``simulate_game`` from the output of ``encode_position``
+
+    Args:
+        position:
+        policy:
+        max_moves:
+
+    Returns:
+        GameResult
+
+    """
+    num_rows, num_cols, colors, color, ko, passes, komi = position
+    board = PlayoutBoard.from_colors(num_rows, num_cols, colors)
+    return _play_out(
+        board, color, ko, passes, komi, policy, max_moves, None)
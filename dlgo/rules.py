@@ -0,0 +1,72 @@
+"""Rules module
+
+A ruleset fixes the komi, how finished games are scored and which ko rule
+forbids repetition. It is chosen when a game starts with ``new_game`` and is
+shared by every state of that game.
+
+Scoring is either ``AREA`` (stones plus surrounded points) or ``TERRITORY``
+(surrounded points plus prisoners). The ko rule is one of
+
+* ``SITUATIONAL``: no move may recreate an earlier board with the same player
+  to move,
+* ``POSITIONAL``: no move may recreate an earlier board at all,
+* ``SIMPLE``: only the immediate recapture of a ko is forbidden. Game states
+  then keep no history of earlier positions, which makes them cheaper to
+  create and to check.
+
+"""
+from collections import namedtuple
+
+__all__ = [
+    'AREA',
+    'DEFAULT_RULES',
+    'POSITIONAL',
+    'Ruleset',
+    'SIMPLE',
+    'SITUATIONAL',
+    'TERRITORY',
+    'get_rules',
+]
+
+AREA = 'area'
+TERRITORY = 'territory'
+
+SITUATIONAL = 'situational'
+POSITIONAL = 'positional'
+SIMPLE = 'simple'
+
+
+class Ruleset(namedtuple('Ruleset', 'komi scoring ko')):
+    """Komi, scoring method and ko rule of a game
+
+    Args:
+        komi: points given to white
+        scoring: AREA or TERRITORY
+        ko: SITUATIONAL, POSITIONAL or SIMPLE
+
+    """
+    __slots__ = ()
+
+    def __new__(cls, komi=7.5, scoring=AREA, ko=SITUATIONAL):
+        if scoring not in (AREA, TERRITORY):
+            raise ValueError('Unknown scoring method: %r' % scoring)
+        if ko not in (SITUATIONAL, POSITIONAL, SIMPLE):
+            raise ValueError('Unknown ko rule: %r' % ko)
+        return super().__new__(cls, komi, scoring, ko)
+
+
+DEFAULT_RULES = Ruleset()
+
+
+def get_rules(game_state):
+    """Ruleset of a game state; game states without one follow the
+    default rules
+
+    Args:
+        game_state:
+
+    Returns:
+        Ruleset
+
+    """
+    return getattr(game_state, 'rules', DEFAULT_RULES)
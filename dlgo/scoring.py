@@ -1,7 +1,10 @@
 from __future__ import absolute_import
 from collections import namedtuple
 
+import numpy as np
+
 from dlgo.gotypes import Player, Point
+from dlgo.rules import AREA, get_rules
 
 
 class Territory(object):
@@ -25,6 +28,18 @@ class Territory(object):
                 self.num_dame += 1
                 self.dame_points.append(point)
 
+    @classmethod
+    def from_counts(cls, num_black_territory, num_white_territory,
+                    num_black_stones, num_white_stones, dame_points):
+        territory = cls({})
+        territory.num_black_territory = num_black_territory
+        territory.num_white_territory = num_white_territory
+        territory.num_black_stones = num_black_stones
+        territory.num_white_stones = num_white_stones
+        territory.num_dame = len(dame_points)
+        territory.dame_points = dame_points
+        return territory
+
 # <1> A `territory_map` splits the board into stones, territory and neutral points (dame).
 # <2> Depending on the status of a point, we increment the respective counter.
 
@@ -47,6 +62,128 @@ class GameResult(namedtuple('GameResult', 'b w komi')):
             return 'B+%.1f' % (self.b - w,)
         return 'W+%.1f' % (w - self.b,)
 
+# Point colours of the flat padded layout. ``goboard_array`` defines them
+# and these must stay equal to its values, as its ``colors()`` bytes are
+# scored as they are; they are repeated here because ``goboard_array``
+# imports ``goboard_fast``, which imports this module.
+EMPTY = 0
+BLACK = 1
+WHITE = 2
+BORDER = 3
+
+_layouts = {}
+
+
+class _Layout:
+    """Flat padded layout of a board size: ``points`` are the indices of the
+    points on the board, ``neighbors`` a 4 x M array of the indices next to
+    them"""
+    def __init__(self, num_rows, num_cols):
+        self.stride = num_cols + 2
+        self.size = (num_rows + 2) * self.stride
+        self.points = np.array([
+            row * self.stride + col
+            for row in range(1, num_rows + 1)
+            for col in range(1, num_cols + 1)
+        ])
+        self.neighbors = self.points[None, :] + np.array(
+            [-self.stride, -1, 1, self.stride])[:, None]
+
+
+def _layout(num_rows, num_cols):
+    layout = _layouts.get((num_rows, num_cols))
+    if layout is None:
+        layout = _layouts[num_rows, num_cols] = _Layout(num_rows, num_cols)
+    return layout
+
+
+def label_regions(boards, mask, points, neighbors):
+    """Label the connected regions of equal points within a mask
+
+    Labels spread to the smallest index of each region by array-wide
+    passes with pointer jumping, so the number of passes grows with the
+    logarithm of the region size rather than with the board.
+
+    Args:
+        boards: K x P stack of flat padded boards
+        mask: K x P bool array of the points to join up
+        points: indices of the points on the board
+        neighbors: 4 x M array of the indices next to ``points``
+
+    Returns:
+        K x P array holding, for every masked point, the smallest index of
+        its region, and for other points their own index
+
+    """
+    own = boards[:, points]
+    joined = [
+        mask[:, points] & (boards[:, around] == own)
+        for around in neighbors
+    ]
+    labels = np.broadcast_to(
+        np.arange(boards.shape[1], dtype=np.int32), boards.shape).copy()
+    while True:
+        current = labels[:, points]
+        for around, same in zip(neighbors, joined):
+            current = np.where(
+                same, np.minimum(current, labels[:, around]), current)
+        new_labels = labels.copy()
+        new_labels[:, points] = current
+        # Pointer jumping: take over the label of the label.
+        new_labels = np.take_along_axis(new_labels, new_labels, axis=1)
+        if np.array_equal(new_labels, labels):
+            return labels
+        labels = new_labels
+
+
+def territory_masks(boards, points, neighbors):
+    """Split the points of a stack of boards into stones and territory
+
+    An empty region bordered by stones of a single colour is that colour's
+    territory; any other empty region is dame.
+
+    Args:
+        boards: K x P stack of flat padded boards
+        points: indices of the points on the board
+        neighbors: 4 x M array of the indices next to ``points``
+
+    Returns:
+        (colors, black_territory, white_territory), K x M arrays
+
+    """
+    num_boards, size = boards.shape
+    colors = boards[:, points]
+    empty = colors == EMPTY
+    labels = label_regions(boards, boards == EMPTY, points, neighbors)
+    regions = np.arange(num_boards)[:, None] * size + labels[:, points]
+    around = boards[:, neighbors]
+    borders_black = np.bincount(
+        regions[empty & (around == BLACK).any(axis=1)],
+        minlength=num_boards * size) > 0
+    borders_white = np.bincount(
+        regions[empty & (around == WHITE).any(axis=1)],
+        minlength=num_boards * size) > 0
+    black_territory = empty & borders_black[regions] & \
+        ~borders_white[regions]
+    white_territory = empty & borders_white[regions] & \
+        ~borders_black[regions]
+    return colors, black_territory, white_territory
+
+
+def _board_array(board, layout):
+    if hasattr(board, 'colors'):
+        return np.frombuffer(board.colors(), np.uint8)
+    colors = np.full(layout.size, BORDER, np.uint8)
+    for idx in layout.points:
+        stone = board.get(Point(
+            row=idx // layout.stride, col=idx % layout.stride))
+        if stone is None:
+            colors[idx] = EMPTY
+        else:
+            colors[idx] = BLACK if stone == Player.black else WHITE
+    return colors
+
+
 """ evaluate_territory:
 Map a board into territory and dame.
 Any points that are completely surrounded by a single color are
@@ -56,68 +193,68 @@ trivially dead groups.
 
 
 def evaluate_territory(board):
+    layout = _layout(board.num_rows, board.num_cols)
+    colors, black_territory, white_territory = territory_masks(
+        _board_array(board, layout)[None, :], layout.points,
+        layout.neighbors)
+    colors = colors[0]
+    dame = (colors == EMPTY) & ~black_territory[0] & ~white_territory[0]
+    return Territory.from_counts(
+        num_black_territory=int(black_territory.sum()),
+        num_white_territory=int(white_territory.sum()),
+        num_black_stones=int((colors == BLACK).sum()),
+        num_white_stones=int((colors == WHITE).sum()),
+        dame_points=[
+            Point(row=idx // layout.stride, col=idx % layout.stride)
+            for idx in layout.points[dame]
+        ])
 
-    status = {}
-    for r in range(1, board.num_rows + 1):
-        for c in range(1, board.num_cols + 1):
-            p = Point(row=r, col=c)
-            if p in status:  # <1>
-                continue
-            stone = board.get(p)
-            if stone is not None:  # <2>
-                status[p] = board.get(p)
-            else:
-                group, neighbors = _collect_region(p, board)
-                if len(neighbors) == 1:  # <3>
-                    neighbor_stone = neighbors.pop()
-                    stone_str = 'b' if neighbor_stone == Player.black else 'w'
-                    fill_with = 'territory_' + stone_str
-                else:
-                    fill_with = 'dame'  # <4>
-                for pos in group:
-                    status[pos] = fill_with
-    return Territory(status)
-
-# <1> Skip the point, if you already visited this as part of a different group.
-# <2> If the point is a stone, add it as status.
-# <3> If a point is completely surrounded by black or white stones, count it as territory.
-# <4> Otherwise the point has to be a neutral point, so we add it to dame.
-
-
-""" _collect_region:
-Find the contiguous section of a board containing a point. Also
-identify all the boundary points.
-"""
 
+def _stones_played(game_state):
+    """Stones each player has put on the board along the line of play,
+    counting those of the first position
 
-def _collect_region(start_pos, board, visited=None):
-
-    if visited is None:
-        visited = {}
-    if start_pos in visited:
-        return [], set()
-    all_points = [start_pos]
-    all_borders = set()
-    visited[start_pos] = True
-    here = board.get(start_pos)
-    deltas = [(-1, 0), (1, 0), (0, -1), (0, 1)]
-    for delta_r, delta_c in deltas:
-        next_p = Point(row=start_pos.row + delta_r, col=start_pos.col + delta_c)
-        if not board.is_on_grid(next_p):
-            continue
-        neighbor = board.get(next_p)
-        if neighbor == here:
-            points, borders = _collect_region(next_p, board, visited)
-            all_points += points
-            all_borders |= borders
-        else:
-            all_borders.add(neighbor)
-    return all_points, all_borders
+    Returns:
+        (black, white)
+
+    """
+    played = {Player.black: 0, Player.white: 0}
+    while game_state.previous_state is not None:
+        if game_state.last_move.is_play:
+            played[game_state.previous_state.next_player] += 1
+        game_state = game_state.previous_state
+    board = game_state.board
+    colors = _board_array(board, _layout(board.num_rows, board.num_cols))
+    return (
+        played[Player.black] + int((colors == BLACK).sum()),
+        played[Player.white] + int((colors == WHITE).sum()))
 
 
 def compute_game_result(game_state):
+    rules = get_rules(game_state)
+    if rules.scoring == AREA:
+        return compute_board_result(game_state.board, komi=rules.komi)
+    # Territory scoring: every stone a player put down that is no longer
+    # on the board is a prisoner of the opponent.
     territory = evaluate_territory(game_state.board)
+    black_played, white_played = _stones_played(game_state)
+    return GameResult(
+        territory.num_black_territory +
+        white_played - territory.num_white_stones,
+        territory.num_white_territory +
+        black_played - territory.num_black_stones,
+        komi=rules.komi)
+
+
+def compute_board_result(board, komi=7.5):
+    # Finished playouts leave only single-point eyes, which the board can
+    # score from its stone counts without a full territory pass.
+    if hasattr(board, 'eye_area'):
+        area = board.eye_area()
+        if area is not None:
+            return GameResult(area[0], area[1], komi=komi)
+    territory = evaluate_territory(board)
     return GameResult(
         territory.num_black_territory + territory.num_black_stones,
         territory.num_white_territory + territory.num_white_stones,
-        komi=7.5)
+        komi=komi)
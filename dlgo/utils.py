@@ -75,17 +75,43 @@ def point_from_coords(coords: str) -> gotypes.Point:
 
 
 class MoveAge():
+    """Age of every stone, in stones placed since it was played
+
+    Each stone is stamped with the value of a move clock when it is played
+    and its age is worked out on demand as clock minus stamp, so aging all
+    the stones is just a tick of the clock. Empty points have age -1.
+
+    Args:
+        board:
+
+    """
     def __init__(self, board):
-        self.move_ages = - np.ones((board.num_rows, board.num_cols))
+        self.clock = 0
+        self.stamps = np.full((board.num_rows, board.num_cols), -1, np.int64)
+
+    @property
+    def move_ages(self):
+        """Ages of all points as an array, -1 where there is no stone"""
+        return np.where(self.stamps > -1, self.clock - self.stamps, -1)
 
     def get(self, row, col):
-        return self.move_ages[row, col]
+        stamp = self.stamps[row, col]
+        if stamp < 0:
+            return -1
+        return self.clock - stamp
 
     def reset_age(self, point):
-        self.move_ages[point.row - 1, point.col - 1] = -1
+        self.stamps[point.row - 1, point.col - 1] = -1
 
     def add(self, point):
-        self.move_ages[point.row - 1, point.col - 1] = 0
+        self.stamps[point.row - 1, point.col - 1] = self.clock
 
     def increment_all(self):
-        self.move_ages[self.move_ages > -1] += 1
\ No newline at end of file
+        self.clock += 1
+
+    def copy(self):
+        """Independent copy, for a copy of the board"""
+        copied = MoveAge.__new__(MoveAge)
+        copied.clock = self.clock
+        copied.stamps = self.stamps.copy()
+        return copied
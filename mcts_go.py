@@ -1,6 +1,6 @@
 import time
 
-from dlgo import goboard_fast
+from dlgo import goboard_array
 from dlgo import gotypes
 from dlgo.agent import MCTSAgent, RandomBot
 from dlgo.utils import print_board, print_move, point_from_coords
@@ -26,7 +26,7 @@ def capture_diff(game_state):
 
 
 def main():
-    game = goboard_fast.GameState.new_game(BOARD_SIZE)
+    game = goboard_array.GameState.new_game(BOARD_SIZE)
 
     bots = {
         gotypes.Player.white: MCTSAgent(500, temperature=0.8),
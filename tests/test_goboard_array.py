@@ -0,0 +1,162 @@
+"""Round-trip checks of the array board against goboard_fast
+
+Random games are played on both boards; after every move the array board
+must agree with goboard_fast on stones, strings, hashes and legality, and
+taking moves back with ``undo`` must restore every earlier position exactly.
+
+"""
+import copy
+import random
+
+import pytest
+
+from dlgo import goboard_array, goboard_fast
+from dlgo.gotypes import Player, Point
+
+SIZES = [(5, 5), (9, 9), (7, 11)]
+
+
+def all_points(board):
+    return [
+        Point(row=row, col=col)
+        for row in range(1, board.num_rows + 1)
+        for col in range(1, board.num_cols + 1)
+    ]
+
+
+def snapshot(board):
+    """Everything observable about an array board"""
+    strings = {}
+    for point in all_points(board):
+        string = board.get_go_string(point)
+        if string is not None:
+            strings[point] = (
+                string.color, frozenset(string.stones),
+                frozenset(string.liberties))
+    return (
+        board.colors(),
+        board.zobrist_hash(),
+        board.symmetric_hashes(),
+        board.stone_counts(),
+        strings,
+        sorted(board.legal_points(Player.black)),
+        sorted(board.legal_points(Player.white)),
+    )
+
+
+def fast_copy(board):
+    fast = goboard_fast.Board(board.num_rows, board.num_cols)
+    for point in all_points(board):
+        stone = board.get(point)
+        if stone is not None:
+            fast.place_stone(stone, point)
+    return fast
+
+
+def assert_matches_fast(board, fast):
+    assert board.zobrist_hash() == fast.zobrist_hash()
+    for point in all_points(board):
+        string = board.get_go_string(point)
+        fast_string = fast.get_go_string(point)
+        if fast_string is None:
+            assert string is None
+            continue
+        assert string.color == fast_string.color
+        assert set(string.stones) == set(fast_string.stones)
+        assert set(string.liberties) == set(fast_string.liberties)
+    for player in (Player.black, Player.white):
+        legal = set(board.legal_points(player))
+        for point in all_points(board):
+            if fast.get(point) is not None:
+                assert point not in legal
+                continue
+            assert (point in legal) == (not fast.is_self_capture(
+                player, point))
+            assert board.will_capture(player, point) == \
+                fast.will_capture(player, point)
+            if point in legal:
+                assert board.next_zobrist_hash(player, point) == \
+                    fast.next_zobrist_hash(player, point)
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_play_matches_goboard_fast(size):
+    rng = random.Random(sum(size))
+    board = goboard_array.Board(*size)
+    fast = goboard_fast.Board(*size)
+    player = Player.black
+    for _ in range(3 * size[0] * size[1]):
+        legal = board.legal_points(player)
+        if not legal:
+            break
+        point = rng.choice(legal)
+        board.play(player, point)
+        fast.place_stone(player, point)
+        assert_matches_fast(board, fast)
+        player = player.other
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_undo_restores_every_position(size):
+    rng = random.Random(sum(size))
+    board = goboard_array.Board(*size)
+    snapshots = []
+    player = Player.black
+    for _ in range(3 * size[0] * size[1]):
+        legal = board.legal_points(player)
+        if not legal:
+            break
+        snapshots.append(snapshot(board))
+        point = rng.choice(legal)
+        # play() must leave the board as a copy with place_stone() would.
+        placed = copy.deepcopy(board)
+        placed.place_stone(player, point)
+        board.play(player, point)
+        assert snapshot(board) == snapshot(placed)
+        player = player.other
+    while snapshots:
+        board.undo()
+        assert snapshot(board) == snapshots.pop()
+
+
+def test_undo_then_play_again():
+    rng = random.Random(7)
+    board = goboard_array.Board(9, 9)
+    player = Player.black
+    for _ in range(200):
+        legal = board.legal_points(player)
+        if not legal:
+            break
+        # Step back now and then and check the board keeps working.
+        if rng.random() < 0.3:
+            board.play(player, rng.choice(legal))
+            board.undo()
+            legal = board.legal_points(player)
+        board.play(player, rng.choice(legal))
+        player = player.other
+    assert_matches_fast(board, fast_copy(board))
+
+
+@pytest.mark.parametrize('size', SIZES)
+def test_legality_of_moves_made_unchecked(size):
+    # Moves are picked through goboard_fast, so the array board is asked
+    # for its legality flags only after playing and taking moves back.
+    rng = random.Random(sum(size))
+    board = goboard_array.Board(*size)
+    fast = goboard_fast.Board(*size)
+    player = Player.black
+    for _ in range(size[0] * size[1]):
+        legal = [
+            point for point in all_points(board)
+            if fast.get(point) is None and
+            not fast.is_self_capture(player, point)
+        ]
+        if not legal:
+            break
+        point = rng.choice(legal)
+        board.play(player, point)
+        fast.place_stone(player, point)
+        player = player.other
+    for _ in range(size[0]):
+        board.undo()
+    assert_matches_fast(board, fast_copy(board))
@@ -0,0 +1,124 @@
+"""Checks of the ko rules and of territory scoring
+
+The ko positions hold two kos: in the upper one black can take a white
+stone, in the lower one white can take a black stone.
+
+"""
+import pytest
+
+from dlgo import goboard_array, goboard_fast, scoring
+from dlgo.goboard_fast import Move
+from dlgo.gotypes import Player, Point
+from dlgo.rules import (
+    AREA, POSITIONAL, SIMPLE, SITUATIONAL, TERRITORY, Ruleset,
+)
+from dlgo.scoring import GameResult, compute_game_result
+
+MODULES = [goboard_fast, goboard_array]
+
+KO_SHAPE = [
+    (1, 2, Player.black), (1, 3, Player.white),
+    (2, 1, Player.black), (2, 2, Player.white), (2, 4, Player.white),
+    (3, 2, Player.black), (3, 3, Player.white),
+]
+
+
+def double_ko(module, ko):
+    board = module.Board(7, 7)
+    for row, col, player in KO_SHAPE:
+        board.place_stone(player, Point(row, col))
+        board.place_stone(player.other, Point(row + 4, col))
+    return module.GameState(
+        board, Player.black, None, None, Ruleset(ko=ko))
+
+
+def play(game, *moves):
+    for move in moves:
+        assert game.is_valid_move(move), move
+        game = game.apply_move(move)
+    return game
+
+
+def at(row, col):
+    return Move.play(Point(row, col))
+
+
+@pytest.mark.parametrize('module', MODULES)
+@pytest.mark.parametrize('ko', [SIMPLE, SITUATIONAL, POSITIONAL])
+def test_immediate_retake_is_illegal(module, ko):
+    game = play(double_ko(module, ko), at(2, 3))
+    assert not game.is_valid_move(at(2, 2))
+    assert at(2, 2) not in game.legal_moves()
+    # After an exchange elsewhere the ko may be taken back.
+    game = play(game, at(6, 3), Move.pass_turn())
+    assert game.is_valid_move(at(2, 2))
+
+
+@pytest.mark.parametrize('module', MODULES)
+@pytest.mark.parametrize('ko, legal', [
+    (SIMPLE, True), (SITUATIONAL, False), (POSITIONAL, False)])
+def test_repeating_with_the_same_player_to_move(module, ko, legal):
+    game = play(
+        double_ko(module, ko),
+        Move.pass_turn(), at(6, 3), at(2, 3), Move.pass_turn(), at(6, 2))
+    # Retaking the upper ko brings back the first position, black to move.
+    assert game.is_valid_move(at(2, 2)) == legal
+    assert (at(2, 2) in game.legal_moves()) == legal
+
+
+@pytest.mark.parametrize('module', MODULES)
+@pytest.mark.parametrize('ko, legal', [
+    (SIMPLE, True), (SITUATIONAL, True), (POSITIONAL, False)])
+def test_repeating_with_the_other_player_to_move(module, ko, legal):
+    game = play(
+        double_ko(module, ko),
+        at(2, 3), at(6, 3), Move.pass_turn(), at(2, 2))
+    # Retaking the lower ko brings back the first position, white to move.
+    assert game.is_valid_move(at(6, 2)) == legal
+    assert (at(6, 2) in game.legal_moves()) == legal
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_simple_ko_keeps_no_history(module):
+    game = play(double_ko(module, SIMPLE), at(2, 3))
+    assert game.history is None
+
+
+def game_with_capture(module, scoring):
+    # Black walls off the first column, white the last; a white stone
+    # played into black's side is captured, then both pass.
+    game = module.GameState.new_game(
+        5, Ruleset(komi=0.5, scoring=scoring))
+    for row in range(1, 6):
+        game = play(game, at(row, 2), at(row, 4))
+    return play(
+        game, at(2, 1), at(3, 1), at(4, 1),
+        Move.pass_turn(), Move.pass_turn())
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_territory_scoring_counts_prisoners(module):
+    game = game_with_capture(module, TERRITORY)
+    assert game.is_over()
+    # Black: 3 points of territory and 1 prisoner. White: 5 points.
+    assert compute_game_result(game) == GameResult(4, 5, 0.5)
+    assert game.winner() == Player.white
+
+
+@pytest.mark.parametrize('module', MODULES)
+def test_area_scoring_counts_stones(module):
+    game = game_with_capture(module, AREA)
+    # Black: 7 stones and 3 points. White: 5 stones and 5 points.
+    assert compute_game_result(game) == GameResult(10, 10, 0.5)
+
+
+def test_unknown_rules_are_rejected():
+    with pytest.raises(ValueError):
+        Ruleset(scoring='japanese')
+    with pytest.raises(ValueError):
+        Ruleset(ko='superko')
+
+
+def test_scoring_colors_match_the_array_board():
+    for name in ('EMPTY', 'BLACK', 'WHITE', 'BORDER'):
+        assert getattr(scoring, name) == getattr(goboard_array, name)
@@ -1,49 +1,39 @@
 """Zobrist hashes generator
 
+Prints the Zobrist codes ``dlgo.zobrist`` derives from a seed, one line per
+point and state, e.g. to compare seeds or to export a table.
+
+    python -m utils.zobrist_generator [board_size [seed]]
+
 """
-import random
+import sys
+
+from dlgo import zobrist
 
-from dlgo.gotypes import Player, Point
+STATES = ('empty', 'black', 'white')
 
 
-def to_python(player_state):
-    """fixme
+def main(board_size=zobrist.MAX_BOARD_SIZE, seed=zobrist.SEED):
+    """Print the codes of a board size
 
     Args:
-        player_state:
+        board_size:
+        seed:
 
     Returns:
+        None
 
     """
-    if player_state is None:
-        return 'None'
-
-    if player_state == Player.black:
-        return Player.black
-
-    return Player.white
-
-
-MAX63 = 0x7fffffffffffffff
-EMPTY_BOARD = 0
-
-table = {}
-
-for row in range(1, 20):
-    for col in range(1, 20):
-        for state in (Player.black, Player.white):
-            code = random.randint(0, MAX63)
-            table[Point(row, col), state] = code
-
-print('from .gotypes import Player, Point')
-print('')
-print("__all__ = ['HASH_CODE', 'EMPTY_BOARD']")
-print('')
-print('HASH_CODE = {')
-
-for (pt, state), hash_code in table.items():
-    print('    (%r, %s): %r,' % (pt, to_python(state), hash_code))
-
-print('}')
-print('')
-print('EMPTY_BOARD = %d' % (EMPTY_BOARD,))
+    stride = board_size + 2
+    codes = zobrist.board_codes(board_size, board_size, seed)
+    print('# seed %#x' % (seed,))
+    for row in range(1, board_size + 1):
+        for col in range(1, board_size + 1):
+            for state, name in enumerate(STATES):
+                print('%d %d %s %d' % (
+                    row, col, name, codes[3 * (row * stride + col) + state]))
+    print('empty_board %d' % (zobrist.point_code(0, 0, 0, seed),))
+
+
+if __name__ == '__main__':
+    main(*(int(arg, 0) for arg in sys.argv[1:3]))